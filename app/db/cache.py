@@ -0,0 +1,64 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+from app.db.mongo_client import ExpenseManagerMongoClient
+from app.utils.utils import name_key
+
+
+class ReferenceCache:
+    """TTL + LRU cache of ``categories`` and ``income_source`` documents looked up by name"""
+
+    def __init__(self,
+                 mongo_client: ExpenseManagerMongoClient,
+                 ttl: float = 300,
+                 max_size: int = 1024):
+        self.mongo_client = mongo_client
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, dict]]" = OrderedDict()
+
+    async def get_by_name(self, collection: str, name: str) -> Optional[dict]:
+        """Return a copy of the document named ``name``, missing documents are not cached"""
+        key = (collection, name_key(name))
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+        self.misses += 1
+        document = await self.mongo_client.get_one_record(collection, {"name_key": key[1]})
+        if document is None:
+            self._entries.pop(key, None)
+            return None
+
+        self._entries[key] = (time.monotonic() + self.ttl, document)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return dict(document)
+
+    def invalidate(self, collection: Optional[str] = None) -> None:
+        """Drop cached documents of ``collection`` or everything when it is omitted"""
+        if collection is None:
+            self._entries.clear()
+        else:
+            for key in [key for key in self._entries if key[0] == collection]:
+                del self._entries[key]
+        logger.debug("Reference cache invalidated: {}", collection or "all")
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+reference_cache = ReferenceCache(
+    ExpenseManagerMongoClient(),
+    ttl=float(os.environ.get("REFERENCE_CACHE_TTL", 300)),
+    max_size=int(os.environ.get("REFERENCE_CACHE_SIZE", 1024)),
+)
@@ -0,0 +1,154 @@
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.db.mongo_client import ExpenseManagerMongoClient
+
+MONO_ID_ONLY = {"partialFilterExpression": {"mono_id": {"$exists": True}}}
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    collection: str
+    keys: List[Tuple[str, int]]
+    name: str
+    unique: bool = False
+    collation: Optional[dict] = None
+    options: Dict = field(default_factory=dict)
+
+    def to_model(self) -> IndexModel:
+        kwargs = dict(self.options, name=self.name, unique=self.unique)
+        if self.collation:
+            kwargs["collation"] = self.collation
+        return IndexModel(self.keys, **kwargs)
+
+
+INDEXES: List[IndexSpec] = [
+    # Keyset pagination and date-range filters
+    IndexSpec("expenses", [("date", DESCENDING), ("_id", DESCENDING)], "date_id"),
+    IndexSpec("incomes", [("date", DESCENDING), ("_id", DESCENDING)], "date_id"),
+    # ``sort=amount_*`` listings, scanned in either direction
+    IndexSpec("expenses", [("amount", DESCENDING), ("_id", DESCENDING)], "amount_id"),
+    IndexSpec("incomes", [("amount", DESCENDING), ("_id", DESCENDING)], "amount_id"),
+    # Per-reference listings, newest first
+    IndexSpec("expenses", [("category._id", ASCENDING), ("date", DESCENDING)], "category_date"),
+    IndexSpec("incomes", [("source._id", ASCENDING), ("date", DESCENDING)], "source_date"),
+    # Idempotent Monobank ingestion, manually added records have no statement id
+    IndexSpec("expenses", [("mono_id", ASCENDING)], "mono_id", unique=True, options=MONO_ID_ONLY),
+    IndexSpec("incomes", [("mono_id", ASCENDING)], "mono_id", unique=True, options=MONO_ID_ONLY),
+    # Webhook queue: claiming due items, finding a claimed batch, expiring processed ones
+    IndexSpec("webhook_queue", [("status", ASCENDING), ("available_at", ASCENDING)], "status_available"),
+    IndexSpec("webhook_queue", [("claim", ASCENDING)], "claim", options={"sparse": True}),
+    IndexSpec(
+        "webhook_queue",
+        [("processed_at", ASCENDING)],
+        "processed_ttl",
+        options={"expireAfterSeconds": 7 * 24 * 60 * 60},
+    ),
+    # Monthly rollups read by month range, renamed and merged by reference
+    IndexSpec("monthly_rollups", [("collection", ASCENDING), ("month", ASCENDING)], "collection_month"),
+    IndexSpec("monthly_rollups", [("collection", ASCENDING), ("reference_id", ASCENDING)], "collection_reference"),
+    # Reference name lookups, see ``app.utils.utils.name_key``
+    IndexSpec("categories", [("name_key", ASCENDING)], "name_key", unique=True),
+    IndexSpec("income_source", [("name_key", ASCENDING)], "name_key", unique=True),
+]
+
+# Indexes replaced by the ones above, dropped when indexes are ensured
+RETIRED_INDEXES: List[Tuple[str, str]] = [
+    ("expenses", "dedup_key"),
+    ("incomes", "dedup_key"),
+    ("categories", "name_ci"),
+    ("income_source", "name_ci"),
+]
+
+
+def _by_collection(specs: List[IndexSpec]) -> Dict[str, List[IndexSpec]]:
+    grouped: Dict[str, List[IndexSpec]] = {}
+    for spec in specs:
+        grouped.setdefault(spec.collection, []).append(spec)
+    return grouped
+
+
+async def _create_indexes(mongo_client: ExpenseManagerMongoClient,
+                          collection: str,
+                          specs: List[IndexSpec]) -> List[IndexSpec]:
+    """Create the indexes of one collection, returns the specs that could not be built"""
+    try:
+        created = await mongo_client.db[collection].create_indexes([spec.to_model() for spec in specs])
+        logger.info("Indexes ensured on {}: {}", collection, created)
+        return []
+    except OperationFailure:
+        logger.exception("Failed to ensure indexes on {}, creating them one by one", collection)
+
+    failed = []
+    for spec in specs:
+        try:
+            await mongo_client.db[collection].create_indexes([spec.to_model()])
+        except OperationFailure:
+            logger.exception("Failed to create index {} on {}", spec.name, collection)
+            failed.append(spec)
+    return failed
+
+
+async def ensure_indexes(mongo_client: ExpenseManagerMongoClient,
+                         specs: Optional[List[IndexSpec]] = None) -> None:
+    """Create declared indexes and drop retired ones.
+
+    A failing collection does not stop the others. Unique indexes back deduplication (``mono_id``,
+    ``name_key``) and retired ones could still reject writes, so RuntimeError is raised at the end
+    when any of them failed; other failures only cost performance and are logged.
+    """
+    errors = []
+    for collection, collection_specs in _by_collection(specs or INDEXES).items():
+        for spec in await _create_indexes(mongo_client, collection, collection_specs):
+            if spec.unique:
+                errors.append(f"unique index {spec.name} on {collection} could not be built")
+
+    for collection, name in RETIRED_INDEXES:
+        try:
+            if name in await mongo_client.db[collection].index_information():
+                await mongo_client.db[collection].drop_index(name)
+                logger.info("Dropped retired index {} on {}", name, collection)
+        except OperationFailure:
+            logger.exception("Failed to drop retired index {} on {}", name, collection)
+            errors.append(f"retired index {name} on {collection} could not be dropped")
+
+    if errors:
+        raise RuntimeError(f"Failed to ensure indexes: {'; '.join(errors)}")
+
+
+async def check_indexes(mongo_client: ExpenseManagerMongoClient,
+                        specs: Optional[List[IndexSpec]] = None) -> Dict[str, dict]:
+    """Report missing declared indexes and existing indexes without recorded usage"""
+    report = {}
+    for collection, collection_specs in _by_collection(specs or INDEXES).items():
+        existing = await mongo_client.db[collection].index_information()
+        stats = await mongo_client.aggregate(collection, [{"$indexStats": {}}])
+        usage = {stat["name"]: stat["accesses"]["ops"] for stat in stats}
+        declared = {spec.name for spec in collection_specs}
+
+        report[collection] = {
+            "missing": sorted(declared - existing.keys()),
+            "undeclared": sorted(existing.keys() - declared - {"_id_"}),
+            "unused": sorted(name for name, ops in usage.items() if ops == 0 and name != "_id_"),
+        }
+    return report
+
+
+async def _main(check: bool) -> None:
+    mongo_client = ExpenseManagerMongoClient()
+    if not check:
+        await ensure_indexes(mongo_client)
+    for collection, result in (await check_indexes(mongo_client)).items():
+        logger.info("{}: {}", collection, result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply or check MongoDB indexes")
+    parser.add_argument("--check", action="store_true", help="only report missing and unused indexes")
+    asyncio.run(_main(parser.parse_args().check))
@@ -0,0 +1,80 @@
+import asyncio
+from typing import Dict, Iterable, List
+
+from loguru import logger
+from pymongo import UpdateOne
+
+from app.db.mongo_client import ExpenseManagerMongoClient
+from app.services.rollups import merge_rollups
+from app.utils.utils import embed_reference, name_key
+
+REFERENCE_COLLECTIONS = ("categories", "income_source")
+# Records collection and field embedding each reference collection
+EMBEDDED_IN = {
+    "categories": ("expenses", "category"),
+    "income_source": ("incomes", "source"),
+}
+
+
+async def backfill_name_keys(mongo_client: ExpenseManagerMongoClient,
+                             collections: Iterable[str] = REFERENCE_COLLECTIONS) -> Dict[str, int]:
+    """Write ``name_key`` on reference documents created before it existed"""
+    updated = {}
+    for collection in collections:
+        documents = await mongo_client.get_many_records(
+            collection=collection,
+            projection={"name": 1},
+            find_obj={"name_key": {"$exists": False}},
+        )
+        requests = [
+            UpdateOne({"_id": document["_id"]}, {"$set": {"name_key": name_key(document["name"])}})
+            for document in documents
+        ]
+        if requests:
+            result = await mongo_client.bulk_write(collection, requests, ordered=False)
+            updated[collection] = result.modified_count
+            logger.info("Backfilled name_key on {} documents in {}", result.modified_count, collection)
+        else:
+            updated[collection] = 0
+        await merge_duplicate_name_keys(mongo_client, collection)
+    return updated
+
+
+async def merge_duplicate_name_keys(mongo_client: ExpenseManagerMongoClient, collection: str) -> List[dict]:
+    """Merge reference documents whose names differ only by case or spacing, e.g. "Food" and "food".
+
+    They would fail the unique ``name_key`` index. The oldest document of each group is kept,
+    records and rollups of the others are moved onto it before they are deleted.
+    """
+    groups = await mongo_client.aggregate(collection, [
+        {"$match": {"name_key": {"$exists": True}}},
+        {"$sort": {"_id": 1}},
+        {"$group": {"_id": "$name_key", "documents": {"$push": {"_id": "$_id", "name": "$name"}}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ])
+    records_collection, field = EMBEDDED_IN[collection]
+    merged = []
+    for group in groups:
+        keeper, *duplicates = group["documents"]
+        duplicate_ids = [document["_id"] for document in duplicates]
+        result = await mongo_client.update_many(
+            records_collection,
+            {f"{field}._id": {"$in": duplicate_ids}},
+            {"$set": {field: embed_reference(keeper)}},
+        )
+        await merge_rollups(records_collection, duplicate_ids, keeper)
+        await mongo_client.delete_many(collection, {"_id": {"$in": duplicate_ids}})
+        logger.warning(
+            "Merged {} into {} {!r} ({} {} moved)",
+            [document["name"] for document in duplicates],
+            collection,
+            keeper["name"],
+            result.modified_count,
+            records_collection,
+        )
+        merged.append({"name_key": group["_id"], "kept": keeper, "merged": duplicates})
+    return merged
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill_name_keys(ExpenseManagerMongoClient()))
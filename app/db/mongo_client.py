@@ -1,66 +1,295 @@
-import os
-from typing import Dict, Optional
+import functools
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
 
-from dotenv import load_dotenv
+from bson import ObjectId
 from loguru import logger
-from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.results import UpdateResult
+from motor.motor_asyncio import (
+    AsyncIOMotorChangeStream,
+    AsyncIOMotorClient,
+    AsyncIOMotorCollection,
+    AsyncIOMotorDatabase,
+)
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
 
-load_dotenv()
+from app.db.settings import MongoSettings, read_preference_from_name
+from app.utils.log import log_call, log_result
+from app.utils.metrics import CommandLatencyListener, PoolListener, timed
+
+PERIOD_FORMATS = {
+    "day": "%Y-%m-%d",
+    "week": "%G-W%V",
+    "month": "%Y-%m",
+}
+
+# One document per collection, ``{"_id": collection, "version": ObjectId}``, replaced on every write
+VERSION_COLLECTION = "collection_versions"
+# Collections behind conditionally served listings, writes to other collections are not versioned
+VERSIONED_COLLECTIONS = frozenset({"expenses", "incomes", "categories", "income_source"})
+
+
+def create_client(settings: MongoSettings) -> AsyncIOMotorClient:
+    options = {
+        "maxPoolSize": settings.max_pool_size,
+        "minPoolSize": settings.min_pool_size,
+        "serverSelectionTimeoutMS": settings.server_selection_timeout_ms,
+        "connectTimeoutMS": settings.connect_timeout_ms,
+        "event_listeners": [CommandLatencyListener(), PoolListener()],
+    }
+    if settings.max_idle_time_ms is not None:
+        options["maxIdleTimeMS"] = settings.max_idle_time_ms
+    if settings.wait_queue_timeout_ms is not None:
+        options["waitQueueTimeoutMS"] = settings.wait_queue_timeout_ms
+    if settings.compressors:
+        options["compressors"] = settings.compressors
+    return AsyncIOMotorClient(host=settings.host, **options)
+
+
+def _changed(result: Any) -> bool:
+    """Whether a write result reports any document inserted, modified or deleted"""
+    if isinstance(result, UpdateResult):
+        return bool(result.modified_count or result.upserted_id is not None)
+    if isinstance(result, DeleteResult):
+        return bool(result.deleted_count)
+    if isinstance(result, BulkWriteResult):
+        return bool(result.inserted_count or result.modified_count or result.deleted_count or result.upserted_count)
+    if isinstance(result, (InsertOneResult, InsertManyResult)):
+        return True
+    # ``find_one_and_delete`` returns None when nothing matched
+    return result is not None
+
+
+def versioned(func):
+    """Bump the version of a versioned collection after a write that changed something.
+
+    Failed writes leave the version alone, except a bulk write that applied in part before
+    raising (e.g. an unordered ``insert_many`` with duplicates).
+    """
+    @functools.wraps(func)
+    async def wrapper(self, collection, *args, **kwargs):
+        if collection not in VERSIONED_COLLECTIONS:
+            return await func(self, collection, *args, **kwargs)
+        try:
+            result = await func(self, collection, *args, **kwargs)
+        except BulkWriteError as exc:
+            if any(exc.details.get(count) for count in ("nInserted", "nUpserted", "nModified", "nRemoved")):
+                await self.bump_version(collection)
+            raise
+        if _changed(result):
+            await self.bump_version(collection)
+        return result
+    return wrapper
 
 
 class ExpenseManagerMongoClient:
+    """Process-wide client, opened in the app lifespan or on first use by scripts"""
+
     instance: "ExpenseManagerMongoClient"
-    client: AsyncIOMotorClient
+    settings: MongoSettings
+    _client: Optional[AsyncIOMotorClient]
 
     def __new__(cls):
         if not hasattr(cls, "instance"):
             logger.info("Make new instance of MongoClient")
             cls.instance = super().__new__(cls)
+            cls.instance.settings = MongoSettings.from_env()
+            cls.instance._client = None
+        return cls.instance
+
+    @property
+    def client(self) -> AsyncIOMotorClient:
+        if self._client is None:
+            self._client = create_client(self.settings)
+        return self._client
+
+    @property
+    def db(self) -> AsyncIOMotorDatabase:
+        return self.client[self.settings.db_name]
+
+    @property
+    def read_db(self) -> AsyncIOMotorDatabase:
+        """Database handle for queries that tolerate reading from a secondary"""
+        return self.client.get_database(
+            self.settings.db_name,
+            read_preference=read_preference_from_name(self.settings.read_preference),
+        )
 
-            cls.instance.client = AsyncIOMotorClient(
-                host=os.environ.get("MONGO_HOST"),
-                maxPoolSize=10
+    def _collection(self, collection: str, read_only: bool = False) -> AsyncIOMotorCollection:
+        return (self.read_db if read_only else self.db)[collection]
+
+    async def connect(self) -> None:
+        """Open the pool and make sure the deployment is reachable before serving requests"""
+        await self.client.admin.command("ping")
+        logger.info("Connected to MongoDB, pool size {}-{}", self.settings.min_pool_size, self.settings.max_pool_size)
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            logger.info("MongoDB client closed")
+
+    async def bump_version(self, collection: str) -> None:
+        try:
+            await self.db[VERSION_COLLECTION].update_one(
+                {"_id": collection},
+                {"$set": {"version": ObjectId()}},
+                upsert=True,
             )
-        return cls.instance
+        except Exception:
+            # The write itself went through; clients keep their copy until the next write bumps again
+            logger.exception("Failed to bump version of {}", collection)
 
-    def __init__(self):
-        self.db = self.client[os.environ.get("DB_NAME")]
+    async def get_versions(self, collections: Iterable[str]) -> Dict[str, str]:
+        """Current version of each collection, a collection without one gets it assigned.
 
+        Callers read it before the data, through the same ``read_db`` as the listings, so a
+        version can lag behind the data it tags (costing a refetch) but not run ahead of it.
+        """
+        collections = list(collections)
+        rows = await self.read_db[VERSION_COLLECTION].find({"_id": {"$in": collections}}).to_list(length=None)
+        versions = {row["_id"]: str(row["version"]) for row in rows}
+        for collection in collections:
+            if collection not in versions:
+                row = await self.db[VERSION_COLLECTION].find_one_and_update(
+                    {"_id": collection},
+                    {"$setOnInsert": {"version": ObjectId()}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                )
+                versions[collection] = str(row["version"])
+        return versions
+
+    def watch(self, pipeline: List[dict], resume_after: Optional[dict] = None, **kwargs) -> AsyncIOMotorChangeStream:
+        """Change stream over the whole database, requires a replica set"""
+        log_call("watch", self.settings.db_name, pipeline=pipeline, resume_after=resume_after)
+        return self.db.watch(pipeline, resume_after=resume_after, **kwargs)
+
+    @timed("get_one_record")
     async def get_one_record(self,
                              collection: str,
                              find_obj: Optional[dict] = None,
                              field: Optional[str] = None,
                              mongo_cli_cls=None,
                              *args,
+                             read_only: bool = False,
                              **kwargs) -> Optional[dict]:
         """Get one records"""
-        logger.info(f"-->> Request with arguments: {locals()}")
-        res = await self.db[collection].find_one(find_obj, *args, **kwargs)
-        logger.debug(f"<<-- {res}")
+        log_call("get_one_record", collection, find_obj=find_obj, field=field, kwargs=kwargs)
+        res = await self._collection(collection, read_only).find_one(find_obj, *args, **kwargs)
+        log_result("get_one_record", collection, res)
         return res.get(field) if field is not None and res else res
 
+    @timed("get_many_records")
     async def get_many_records(self,
                                collection: str,
                                projection: Optional[dict] = None,
                                find_obj: Optional[dict] = None,
                                *args,
+                               read_only: bool = False,
                                **kwargs,
                                ) -> Optional[list]:
         """Get many records"""
-        logger.info(f"-->> Request with arguments: {locals()}")
+        log_call("get_many_records", collection, find_obj=find_obj, projection=projection, kwargs=kwargs)
         if find_obj is None:
             find_obj = {}
-        cursor = self.db[collection].find(find_obj, projection, *args, **kwargs)
+        cursor = self._collection(collection, read_only).find(find_obj, projection, *args, **kwargs)
         return await cursor.to_list(length=None)
 
+    @timed("iter_records")
+    async def iter_records(self,
+                           collection: str,
+                           projection: Optional[dict] = None,
+                           find_obj: Optional[dict] = None,
+                           batch_size: int = 500,
+                           *args,
+                           read_only: bool = False,
+                           **kwargs,
+                           ) -> AsyncIterator[dict]:
+        """Iterate over records batch by batch without loading the whole result into memory"""
+        log_call("iter_records", collection, find_obj=find_obj, projection=projection, kwargs=kwargs)
+        if find_obj is None:
+            find_obj = {}
+        cursor = self._collection(collection, read_only).find(find_obj, projection, *args, **kwargs)
+        cursor = cursor.batch_size(batch_size)
+        async for document in cursor:
+            yield document
+
+    @timed("aggregate")
+    async def aggregate(self,
+                        collection: str,
+                        pipeline: List[dict],
+                        *args,
+                        read_only: bool = False,
+                        **kwargs,
+                        ) -> list:
+        """Run aggregation pipeline"""
+        log_call("aggregate", collection, pipeline=pipeline)
+        cursor = self._collection(collection, read_only).aggregate(pipeline, *args, **kwargs)
+        return await cursor.to_list(length=None)
+
+    async def get_period_totals(self,
+                                collection: str,
+                                group_by: str,
+                                date_from: datetime,
+                                date_to: datetime,
+                                granularity: str = "month",
+                                ) -> list:
+        """Sum amounts per period and ``group_by`` field within [date_from, date_to)"""
+        pipeline = [
+            {"$match": {"date": {"$gte": date_from, "$lt": date_to}}},
+            {"$group": {
+                "_id": {
+                    "period": {"$dateToString": {"format": PERIOD_FORMATS[granularity], "date": "$date"}},
+                    "name": f"${group_by}",
+                },
+                "total": {"$sum": "$amount"},
+                "count": {"$sum": 1},
+            }},
+            {"$project": {
+                "_id": 0,
+                "period": "$_id.period",
+                "name": {"$ifNull": ["$_id.name", "Uncategorized"]},
+                "total": 1,
+                "count": 1,
+            }},
+            {"$sort": {"period": 1, "name": 1}},
+        ]
+        return await self.aggregate(collection, pipeline, read_only=True)
+
+    @timed("distinct")
+    async def distinct(self,
+                       collection: str,
+                       key: str,
+                       find_obj: Optional[dict] = None,
+                       ) -> list:
+        """Distinct values of ``key`` among matching documents"""
+        log_call("distinct", collection, key=key, find_obj=find_obj)
+        return await self.db[collection].distinct(key, find_obj or {})
+
+    @timed("insert_one")
+    @versioned
     async def insert_one(self,
                          collection: str,
                          data: Dict):
         """Insert one record"""
-        logger.info(f"-->> Request with arguments: {locals()}")
+        log_call("insert_one", collection, data=data)
         return await self.db[collection].insert_one(data)
 
+    @timed("insert_many")
+    @versioned
+    async def insert_many(self,
+                          collection: str,
+                          data: List[Dict],
+                          ordered: bool = True,
+                          ) -> InsertManyResult:
+        """Insert many records"""
+        log_call("insert_many", collection, count=len(data), ordered=ordered)
+        return await self.db[collection].insert_many(data, ordered=ordered)
+
+    @timed("update_one")
+    @versioned
     async def update_one(self,
                          collection: str,
                          find_obj: dict,
@@ -71,14 +300,69 @@ class ExpenseManagerMongoClient:
                          **kwargs,
                          ) -> UpdateResult:
         """Update document"""
-        logger.info(f"-->> {locals()}")
+        log_call("update_one", collection, find_obj=find_obj, data_to_update=data_to_update, upsert=upsert)
         res = await self.db[collection].update_one(filter=find_obj, update=data_to_update, upsert=upsert)
-        logger.info(f"<<-- {res.raw_result}")
+        log_result("update_one", collection, res.raw_result)
+        return res
+
+    @timed("update_many")
+    @versioned
+    async def update_many(self,
+                          collection: str,
+                          find_obj: dict,
+                          data_to_update: dict,
+                          ) -> UpdateResult:
+        """Update all matching documents"""
+        log_call("update_many", collection, find_obj=find_obj, data_to_update=data_to_update)
+        res = await self.db[collection].update_many(filter=find_obj, update=data_to_update)
+        log_result("update_many", collection, res.raw_result)
         return res
 
+    @timed("count_documents")
+    async def count_documents(self,
+                              collection: str,
+                              find_obj: Optional[dict] = None,
+                              read_only: bool = False,
+                              ) -> int:
+        """Count matching documents"""
+        log_call("count_documents", collection, find_obj=find_obj)
+        return await self._collection(collection, read_only).count_documents(find_obj or {})
+
+    @timed("bulk_write")
+    @versioned
+    async def bulk_write(self,
+                         collection: str,
+                         requests: list,
+                         ordered: bool = True,
+                         ) -> BulkWriteResult:
+        """Execute several write operations in one round trip"""
+        log_call("bulk_write", collection, count=len(requests), ordered=ordered)
+        return await self.db[collection].bulk_write(requests, ordered=ordered)
+
+    @timed("delete_one")
+    @versioned
     async def delete_one(self,
                          collection: str,
                          find_obj: dict):
         """Delete document"""
-        logger.info(f"-->> Request with arguments: {locals()}")
+        log_call("delete_one", collection, find_obj=find_obj)
         return await self.db[collection].delete_one(filter=find_obj)
+
+    @timed("find_one_and_delete")
+    @versioned
+    async def find_one_and_delete(self,
+                                  collection: str,
+                                  find_obj: dict,
+                                  projection: Optional[dict] = None) -> Optional[dict]:
+        """Delete a document and return it"""
+        log_call("find_one_and_delete", collection, find_obj=find_obj, projection=projection)
+        return await self.db[collection].find_one_and_delete(find_obj, projection)
+
+    @timed("delete_many")
+    @versioned
+    async def delete_many(self,
+                          collection: str,
+                          find_obj: dict):
+        """Delete all matching documents"""
+        log_call("delete_many", collection, find_obj=find_obj)
+        return await self.db[collection].delete_many(filter=find_obj)
@@ -0,0 +1,64 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from dotenv import load_dotenv
+from pymongo.read_preferences import ReadPreference, _ServerMode
+
+load_dotenv()
+
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+
+def read_preference_from_name(name: str) -> _ServerMode:
+    try:
+        return READ_PREFERENCES[name]
+    except KeyError:
+        raise ValueError(f"Invalid read preference {name!r}, expected one of: {', '.join(READ_PREFERENCES)}")
+
+
+def _optional_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+@dataclass(frozen=True)
+class MongoSettings:
+    """Connection settings, pool sizes are per process so size them by the uvicorn worker count"""
+
+    host: Optional[str]
+    db_name: Optional[str]
+    max_pool_size: int = 10
+    min_pool_size: int = 0
+    max_idle_time_ms: Optional[int] = None
+    wait_queue_timeout_ms: Optional[int] = None
+    server_selection_timeout_ms: int = 5000
+    connect_timeout_ms: int = 5000
+    # Comma separated, e.g. "zstd,snappy,zlib"; zstd and snappy need the zstandard / python-snappy packages
+    compressors: Optional[str] = None
+    # Read preference of the read-only endpoints (listings, reports, exports)
+    read_preference: str = "primaryPreferred"
+
+    @classmethod
+    def from_env(cls) -> "MongoSettings":
+        read_preference = os.environ.get("MONGO_READ_PREFERENCE", "primaryPreferred")
+        read_preference_from_name(read_preference)
+        return cls(
+            host=os.environ.get("MONGO_HOST"),
+            db_name=os.environ.get("DB_NAME"),
+            max_pool_size=int(os.environ.get("MONGO_MAX_POOL_SIZE", 10)),
+            min_pool_size=int(os.environ.get("MONGO_MIN_POOL_SIZE", 0)),
+            max_idle_time_ms=_optional_int("MONGO_MAX_IDLE_TIME_MS"),
+            wait_queue_timeout_ms=_optional_int("MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+            server_selection_timeout_ms=int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)),
+            connect_timeout_ms=int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", 5000)),
+            compressors=os.environ.get("MONGO_COMPRESSORS") or None,
+            read_preference=read_preference,
+        )
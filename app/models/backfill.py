@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from app.utils.utils import to_naive_local
+
+
+class BackfillCreate(BaseModel):
+    date_from: datetime
+    date_to: Optional[datetime] = None
+    accounts: Optional[List[str]] = None
+
+    @field_validator("date_from", "date_to")
+    @classmethod
+    def naive_local(cls, value: Optional[datetime]) -> Optional[datetime]:
+        return to_naive_local(value)
+
+    @model_validator(mode="after")
+    def check_range(self) -> "BackfillCreate":
+        if self.date_from >= (self.date_to or datetime.now()):
+            raise ValueError("date_from must be earlier than date_to")
+        return self
+
+
+class BackfillJob(BaseModel):
+    id: Optional[str] = Field(alias="_id", default_factory=lambda: str(ObjectId()))
+    status: str
+    date_from: datetime
+    date_to: datetime
+    accounts: Dict[str, datetime] = {}
+    counters: Dict[str, int] = {}
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    def __init__(self, *args, **kwargs):
+        kwargs["_id"] = str(kwargs["_id"])
+        super().__init__(*args, **kwargs)
@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: str
+    id: Optional[str] = None
+    detail: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+class BulkDelete(BaseModel):
+    ids: Optional[List[str]] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    # Category name for expenses, income source name for incomes
+    name: Optional[str] = None
+
+
+class BulkDeleteResult(BaseModel):
+    deleted: int
@@ -0,0 +1,42 @@
+from datetime import datetime
+from enum import Enum
+from typing import List
+
+from pydantic import BaseModel
+
+
+class Granularity(str, Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+
+
+class SummaryBucket(BaseModel):
+    period: str
+    name: str
+    total: float
+    count: int
+
+
+class Summary(BaseModel):
+    date_from: datetime
+    date_to: datetime
+    granularity: Granularity
+    total_expenses: float
+    total_incomes: float
+    expenses: List[SummaryBucket]
+    incomes: List[SummaryBucket]
+
+
+class MonthlyBucket(BaseModel):
+    month: str
+    name: str
+    sum: float
+    count: int
+    min: float
+    max: float
+
+
+class MonthlyRollups(BaseModel):
+    expenses: List[MonthlyBucket]
+    incomes: List[MonthlyBucket]
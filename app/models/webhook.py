@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+from pydantic import BaseModel, ConfigDict, field_validator
+
+
+class StatementItem(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    id: str
+    time: int
+    amount: int
+    description: str = ""
+    mcc: int = 0
+
+    @field_validator("time")
+    @classmethod
+    def check_time(cls, value: int) -> int:
+        # The importer converts it with ``datetime.fromtimestamp``, reject what it cannot represent
+        try:
+            datetime.fromtimestamp(value)
+        except (OverflowError, OSError, ValueError):
+            raise ValueError("time is out of range")
+        return value
+
+
+class WebhookData(BaseModel):
+    account: str
+    statementItem: StatementItem
+
+
+class QueueMetrics(BaseModel):
+    depth: Dict[str, int]
+    oldest_pending_seconds: Optional[float] = None
+    last_batch_lag_seconds: Optional[float] = None
+    processed: int
+    retried: int
+    failed: int
+    workers: int
@@ -1,37 +1,55 @@
-from typing import List
+from typing import Optional
 
 from bson import ObjectId
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, Request, status
 from loguru import logger
+from pymongo.errors import DuplicateKeyError
 
+from app.db.cache import reference_cache
 from app.db.mongo_client import ExpenseManagerMongoClient
 from app.models.category import Category, CategoryCreate
+from app.services.reconciler import reference_reconciler
+from app.utils.conditional import check_not_modified
+from app.utils.serialization import json_list_response, list_response_model, select_fields
+from app.utils.utils import name_key
 
 categories_router = APIRouter()
 mongo_client = ExpenseManagerMongoClient()
 
 
-@categories_router.get("/all", response_model=List[Category])
-async def get_all_categories():
+@categories_router.get("/all", response_model=list_response_model(Category))
+async def get_all_categories(
+    request: Request,
+    fields: Optional[str] = Query(default=None, description="Comma separated fields to return, e.g. name"),
+):
     logger.info("Fetching all categories")
-    return await mongo_client.get_many_records(collection="categories")
 
+    try:
+        projection, projector = select_fields(Category, fields)
+    except ValueError as exc:
+        logger.warning("Invalid categories fields requested: {}", fields)
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    not_modified, cache_headers = await check_not_modified(request, "categories")
+    if not_modified is not None:
+        return not_modified
+
+    categories = await mongo_client.get_many_records(collection="categories", projection=projection, read_only=True)
+    return json_list_response(categories, projector, headers=cache_headers)
 
-@categories_router.get("/{name}")
+
+@categories_router.get("/{name}", response_model=Category)
 async def get_categories_by_name(name: str):
     logger.info("Fetching category by name: {}", name)
 
-    category = await mongo_client.get_one_record(
-        collection="categories",
-        find_obj={"name": {"$regex": f"^{name}$", "$options": "i"}}
-    )
+    category = await reference_cache.get_by_name("categories", name)
 
     if not category:
         logger.warning("Category not found: {}", name)
         raise HTTPException(status_code=404, detail=f"Category {name} not found")
 
     logger.info("Category found: {}", name)
-    return category
+    return Category(**category)
 
 
 @categories_router.post("/add", status_code=status.HTTP_201_CREATED, response_model=Category)
@@ -41,8 +59,9 @@ async def add_new_category(category: CategoryCreate):
     try:
         response = await mongo_client.insert_one(
             collection="categories",
-            data=category.dict(),
+            data={**category.model_dump(), "name_key": name_key(category.name)},
         )
+        reference_cache.invalidate("categories")
 
         logger.info(
             "Category added successfully: {} (id={})",
@@ -52,6 +71,10 @@ async def add_new_category(category: CategoryCreate):
 
         return Category(**category.model_dump(), _id=response.inserted_id)
 
+    except DuplicateKeyError:
+        logger.warning("Category already exists: {}", category.name)
+        raise HTTPException(status_code=409, detail=f"Category {category.name} already exists")
+
     except Exception :
         logger.exception(
             "Failed to add category: {} | payload={}",
@@ -64,6 +87,35 @@ async def add_new_category(category: CategoryCreate):
         )
 
 
+@categories_router.patch("/{category_id}", response_model=Category)
+async def rename_category(category_id: str, category: CategoryCreate):
+    logger.info("Renaming category id={} to {}", category_id, category.name)
+
+    if not ObjectId.is_valid(category_id):
+        logger.warning("Invalid category id received: {}", category_id)
+        raise HTTPException(status_code=400, detail="Invalid category id")
+
+    try:
+        response = await mongo_client.update_one(
+            "categories",
+            {"_id": ObjectId(category_id)},
+            {"$set": {"name": category.name, "name_key": name_key(category.name)}},
+        )
+    except DuplicateKeyError:
+        logger.warning("Category already exists: {}", category.name)
+        raise HTTPException(status_code=409, detail=f"Category {category.name} already exists")
+
+    if response.matched_count == 0:
+        logger.warning("Category not found for rename: {}", category_id)
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    reference_cache.invalidate("categories")
+    reference_reconciler.trigger()
+
+    logger.info("Category renamed successfully: {}", category_id)
+    return Category(name=category.name, _id=category_id)
+
+
 @categories_router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_category(category_id: str):
     logger.info("Deleting category with id={}", category_id)
@@ -77,6 +129,9 @@ async def delete_category(category_id: str):
         {"_id": ObjectId(category_id)},
     )
 
+    reference_cache.invalidate("categories")
+    reference_reconciler.trigger()
+
     if response.deleted_count == 0:
         logger.warning("Category not found for deletion: {}", category_id)
         raise HTTPException(status_code=404, detail="Category not found")
@@ -0,0 +1,28 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
+from app.services.events import event_broker
+
+events_router = APIRouter()
+
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+
+
+@events_router.get("")
+async def get_events(
+    last_event_id: Optional[str] = Header(default=None),
+    resume: Optional[str] = Query(default=None, description="Last received event id when Last-Event-ID cannot be set"),
+):
+    if event_broker.state == "unsupported":
+        raise HTTPException(status_code=503, detail="Live updates need MongoDB running as a replica set")
+
+    logger.info("Events client connected: last_event_id={}", last_event_id or resume)
+    return StreamingResponse(
+        event_broker.subscribe(last_event_id or resume),
+        media_type=EVENT_STREAM_MEDIA_TYPE,
+        # Proxies must pass frames through as they come instead of buffering the response
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,31 +1,165 @@
-from typing import List
+from datetime import datetime
+from typing import Optional
 
 from bson import ObjectId
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from loguru import logger
 
+from app.db.cache import reference_cache
 from app.db.mongo_client import ExpenseManagerMongoClient
+from app.models.bulk import BulkDelete, BulkDeleteResult, BulkResult
 from app.models.expense import Expense, ExpenseCreate
+from app.services.bulk import BulkSpec, build_delete_filter, bulk_delete, bulk_insert, iter_payload
+from app.services.rollups import add_to_rollups, remove_from_rollups
+from app.utils.conditional import check_not_modified
+from app.utils.filters import range_filter
+from app.utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NDJSON_MEDIA_TYPE,
+    NEXT_CURSOR_HEADER,
+    PAGE_SORT,
+    SortOrder,
+    keyset_filter,
+    ndjson_lines,
+    split_page,
+)
+from app.utils.serialization import json_list_response, list_response_model, select_fields
+from app.utils.utils import embed_reference
 
 expenses_router = APIRouter()
 mongo_client = ExpenseManagerMongoClient()
 
+EXPENSES_BULK = BulkSpec(
+    collection="expenses",
+    create_model=ExpenseCreate,
+    name_field="category_name",
+    reference_collection="categories",
+    reference_field="category",
+    reference_label="Category",
+)
 
-@expenses_router.get("/all", response_model=List[Expense])
-async def get_all_expenses():
-    logger.info("Fetching all expenses")
-    return await mongo_client.get_many_records(collection="expenses")
+FIELDS_DESCRIPTION = "Comma separated fields to return, e.g. amount,date,category.name"
 
 
-@expenses_router.get("/category/{category_name}", response_model=List[Expense])
-async def get_expenses_by_category(category_name: str):
-    logger.info("Fetching expenses by category: {}", category_name)
+def get_projection(fields: Optional[str], sort_field: str = "date"):
+    # The sort field is always fetched because page cursors are built from it
+    try:
+        return select_fields(Expense, fields, required=(sort_field,))
+    except ValueError as exc:
+        logger.warning("Invalid expenses fields requested: {}", fields)
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+def get_filter(date_from: Optional[datetime],
+               date_to: Optional[datetime],
+               min_amount: Optional[float],
+               max_amount: Optional[float]) -> dict:
+    try:
+        return range_filter(date_from, date_to, min_amount, max_amount)
+    except ValueError as exc:
+        logger.warning("Invalid expenses range: {}", exc)
+        raise HTTPException(status_code=400, detail=str(exc))
 
-    category = await mongo_client.get_one_record(
-        collection="categories",
-        find_obj={"name": {"$regex": f"^{category_name}$", "$options": "i"}},
+
+@expenses_router.get("/all", response_model=list_response_model(Expense))
+async def get_all_expenses(
+    request: Request,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    fields: Optional[str] = Query(default=None, description=FIELDS_DESCRIPTION),
+    date_from: Optional[datetime] = Query(default=None, alias="from"),
+    date_to: Optional[datetime] = Query(default=None, alias="to"),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    sort: Optional[SortOrder] = None,
+):
+    logger.info(
+        "Fetching all expenses: limit={}, cursor={}, stream={}, fields={}, from={}, to={}, amount=[{}, {}], sort={}",
+        limit,
+        cursor,
+        stream,
+        fields,
+        date_from,
+        date_to,
+        min_amount,
+        max_amount,
+        sort,
     )
 
+    find_obj = get_filter(date_from, date_to, min_amount, max_amount)
+    page_sort = sort.spec if sort else PAGE_SORT
+    try:
+        find_obj = keyset_filter(cursor, find_obj, page_sort)
+    except ValueError:
+        logger.warning("Invalid expenses cursor received: {}", cursor)
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    projection, projector = get_projection(fields, page_sort[0][0])
+
+    not_modified, cache_headers = await check_not_modified(request, "expenses")
+    if not_modified is not None:
+        return not_modified
+
+    if stream:
+        records = mongo_client.iter_records(
+            collection="expenses",
+            projection=projection,
+            find_obj=find_obj,
+            sort=page_sort,
+            limit=limit or 0,
+            read_only=True,
+        )
+        return StreamingResponse(
+            ndjson_lines(records, projector),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=cache_headers,
+        )
+
+    if limit is None and cursor is None:
+        # Without an explicit order the natural order is kept, sorting a full scan costs more than it saves
+        expenses = await mongo_client.get_many_records(
+            collection="expenses",
+            projection=projection,
+            find_obj=find_obj,
+            sort=sort.spec if sort else None,
+            read_only=True,
+        )
+        return json_list_response(expenses, projector, headers=cache_headers)
+
+    limit = limit or DEFAULT_PAGE_SIZE
+    expenses = await mongo_client.get_many_records(
+        collection="expenses",
+        projection=projection,
+        find_obj=find_obj,
+        sort=page_sort,
+        limit=limit + 1,
+        read_only=True,
+    )
+    expenses, next_cursor = split_page(expenses, limit, page_sort)
+    headers = {**cache_headers, NEXT_CURSOR_HEADER: next_cursor} if next_cursor else cache_headers
+
+    return json_list_response(expenses, projector, headers=headers)
+
+
+@expenses_router.get("/category/{category_name}", response_model=list_response_model(Expense))
+async def get_expenses_by_category(
+    category_name: str,
+    fields: Optional[str] = Query(default=None, description=FIELDS_DESCRIPTION),
+    date_from: Optional[datetime] = Query(default=None, alias="from"),
+    date_to: Optional[datetime] = Query(default=None, alias="to"),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    sort: Optional[SortOrder] = None,
+):
+    logger.info("Fetching expenses by category: {}", category_name)
+    find_obj = get_filter(date_from, date_to, min_amount, max_amount)
+    projection, projector = get_projection(fields)
+
+    category = await reference_cache.get_by_name("categories", category_name)
+
     if not category:
         logger.warning("Category not found while fetching expenses: {}", category_name)
         raise HTTPException(
@@ -35,7 +169,10 @@ async def get_expenses_by_category(category_name: str):
 
     expenses = await mongo_client.get_many_records(
         collection="expenses",
-        find_obj={"category._id": ObjectId(category["_id"])},
+        projection=projection,
+        find_obj={**find_obj, "category._id": ObjectId(category["_id"])},
+        sort=sort.spec if sort else None,
+        read_only=True,
     )
 
     logger.info(
@@ -43,7 +180,7 @@ async def get_expenses_by_category(category_name: str):
         len(expenses),
         category_name,
     )
-    return expenses
+    return json_list_response(expenses, projector)
 
 
 @expenses_router.post("/add", status_code=status.HTTP_201_CREATED, response_model=Expense)
@@ -54,10 +191,7 @@ async def add_new_expense(expense: ExpenseCreate):
         expense.amount,
     )
 
-    category = await mongo_client.get_one_record(
-        collection="categories",
-        find_obj={"name": {"$regex": f"^{expense.category_name}$", "$options": "i"}},
-    )
+    category = await reference_cache.get_by_name("categories", expense.category_name)
 
     if not category:
         logger.warning(
@@ -70,7 +204,7 @@ async def add_new_expense(expense: ExpenseCreate):
         )
 
     expense_dict = expense.model_dump()
-    expense_dict["category"] = category
+    expense_dict["category"] = embed_reference(category)
     expense_dict.pop("category_name")
 
     try:
@@ -78,6 +212,7 @@ async def add_new_expense(expense: ExpenseCreate):
             collection="expenses",
             data=expense_dict,
         )
+        await add_to_rollups("expenses", [expense_dict])
 
         logger.info(
             "Expense added successfully: id={}, category={}, amount={}",
@@ -100,6 +235,23 @@ async def add_new_expense(expense: ExpenseCreate):
         )
 
 
+@expenses_router.post("/bulk", response_model=BulkResult)
+async def add_expenses_bulk(request: Request):
+    logger.info("Adding expenses in bulk")
+    result = await bulk_insert(EXPENSES_BULK, iter_payload(request))
+    logger.info("Bulk expenses added: created={}, failed={}", result["created"], result["failed"])
+    return result
+
+
+@expenses_router.post("/bulk/delete", response_model=BulkDeleteResult)
+async def delete_expenses_bulk(criteria: BulkDelete):
+    logger.info("Deleting expenses in bulk: {}", criteria)
+    find_obj = await build_delete_filter(EXPENSES_BULK, criteria)
+    deleted = await bulk_delete(EXPENSES_BULK, find_obj)
+    logger.info("Bulk expenses deleted: {}", deleted)
+    return {"deleted": deleted}
+
+
 @expenses_router.delete("/{expense_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_expense(expense_id: str):
     logger.info("Deleting expense with id={}", expense_id)
@@ -108,14 +260,17 @@ async def delete_expense(expense_id: str):
         logger.warning("Invalid expense id received: {}", expense_id)
         raise HTTPException(status_code=400, detail="Invalid expense id")
 
-    response = await mongo_client.delete_one(
+    expense = await mongo_client.find_one_and_delete(
         "expenses",
         {"_id": ObjectId(expense_id)},
+        projection={"date": 1, "amount": 1, "category": 1},
     )
 
-    if response.deleted_count == 0:
+    if expense is None:
         logger.warning("Expense not found for deletion: {}", expense_id)
         raise HTTPException(status_code=404, detail="Expense not found")
 
+    await remove_from_rollups("expenses", [expense])
+
     logger.info("Expense deleted successfully: {}", expense_id)
     return {"message": "Expense deleted successfully", "id": expense_id}
\ No newline at end of file
@@ -0,0 +1,103 @@
+from datetime import datetime
+from enum import Enum
+from importlib.util import find_spec
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from loguru import logger
+from pymongo import ASCENDING
+
+from app.db.cache import reference_cache
+from app.db.mongo_client import ExpenseManagerMongoClient
+from app.services.export import (
+    EXPENSES_EXPORT,
+    INCOMES_EXPORT,
+    ExportSpec,
+    csv_chunks,
+    gzip_chunks,
+    parquet_chunks,
+)
+from app.utils.filters import range_filter
+
+export_router = APIRouter()
+mongo_client = ExpenseManagerMongoClient()
+
+
+class ExportFormat(str, Enum):
+    csv = "csv"
+    parquet = "parquet"
+
+
+MEDIA_TYPES = {
+    ExportFormat.csv: "text/csv",
+    ExportFormat.parquet: "application/vnd.apache.parquet",
+}
+
+
+async def export_records(spec: ExportSpec,
+                         export_format: ExportFormat,
+                         date_from: Optional[datetime],
+                         date_to: Optional[datetime],
+                         name: Optional[str],
+                         gzip: bool) -> StreamingResponse:
+    if export_format is ExportFormat.parquet and find_spec("pyarrow") is None:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow to be installed")
+
+    try:
+        find_obj = range_filter(date_from, date_to)
+    except ValueError as exc:
+        logger.warning("Invalid export range: {}", exc)
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    if name is not None:
+        reference = await reference_cache.get_by_name(spec.reference_collection, name)
+        if not reference:
+            logger.warning("{} not found while exporting: {}", spec.reference_collection, name)
+            raise HTTPException(status_code=404, detail=f"{name} not found")
+        find_obj[f"{spec.reference_field}._id"] = reference["_id"]
+
+    records = mongo_client.iter_records(
+        collection=spec.collection,
+        find_obj=find_obj,
+        sort=[("date", ASCENDING), ("_id", ASCENDING)],
+        batch_size=1000,
+        read_only=True,
+    )
+    chunks = csv_chunks(spec, records) if export_format is ExportFormat.csv else parquet_chunks(spec, records)
+
+    filename = f"{spec.collection}.{export_format.value}"
+    media_type = MEDIA_TYPES[export_format]
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    logger.info("Exporting {}: filter={}, format={}, gzip={}", spec.collection, find_obj, export_format.value, gzip)
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@export_router.get("/expenses")
+async def export_expenses(
+    export_format: ExportFormat = Query(default=ExportFormat.csv, alias="format"),
+    date_from: Optional[datetime] = Query(default=None, alias="from"),
+    date_to: Optional[datetime] = Query(default=None, alias="to"),
+    category: Optional[str] = None,
+    gzip: bool = False,
+):
+    return await export_records(EXPENSES_EXPORT, export_format, date_from, date_to, category, gzip)
+
+
+@export_router.get("/incomes")
+async def export_incomes(
+    export_format: ExportFormat = Query(default=ExportFormat.csv, alias="format"),
+    date_from: Optional[datetime] = Query(default=None, alias="from"),
+    date_to: Optional[datetime] = Query(default=None, alias="to"),
+    source: Optional[str] = None,
+    gzip: bool = False,
+):
+    return await export_records(INCOMES_EXPORT, export_format, date_from, date_to, source, gzip)
@@ -1,19 +1,40 @@
-from typing import List
-from fastapi import APIRouter, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, status
 from bson import ObjectId
 from loguru import logger
+from pymongo.errors import DuplicateKeyError
 
+from app.db.cache import reference_cache
 from app.db.mongo_client import ExpenseManagerMongoClient
 from app.models.income_source import IncomeSource, IncomeSourceCreate
+from app.services.reconciler import reference_reconciler
+from app.utils.conditional import check_not_modified
+from app.utils.serialization import json_list_response, list_response_model, select_fields
+from app.utils.utils import name_key
 
 incomes_sources_router = APIRouter()
 mongo_client = ExpenseManagerMongoClient()
 
 
-@incomes_sources_router.get("/all", response_model=List[IncomeSource])
-async def get_all_income_source():
+@incomes_sources_router.get("/all", response_model=list_response_model(IncomeSource))
+async def get_all_income_source(
+    request: Request,
+    fields: Optional[str] = Query(default=None, description="Comma separated fields to return, e.g. name"),
+):
     logger.info("Fetching all income sources")
-    return await mongo_client.get_many_records(collection="income_source")
+
+    try:
+        projection, projector = select_fields(IncomeSource, fields)
+    except ValueError as exc:
+        logger.warning("Invalid income sources fields requested: {}", fields)
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    not_modified, cache_headers = await check_not_modified(request, "income_source")
+    if not_modified is not None:
+        return not_modified
+
+    income_source = await mongo_client.get_many_records(collection="income_source", projection=projection, read_only=True)
+    return json_list_response(income_source, projector, headers=cache_headers)
 
 
 @incomes_sources_router.post("/add", status_code=status.HTTP_201_CREATED, response_model=IncomeSource)
@@ -22,14 +43,18 @@ async def add_new_income_source(category: IncomeSourceCreate):
     try:
         response = await mongo_client.insert_one(
             collection="income_source",
-            data=category.dict()
+            data={**category.model_dump(), "name_key": name_key(category.name)}
         )
+        reference_cache.invalidate("income_source")
         logger.info(
             "Income source added successfully: {} (id={})",
             category.name,
             response.inserted_id
         )
         return IncomeSource(**category.model_dump(), _id=response.inserted_id)
+    except DuplicateKeyError:
+        logger.warning("Income source already exists: {}", category.name)
+        raise HTTPException(status_code=409, detail=f"Income source {category.name} already exists")
     except Exception:
         logger.exception(
             "Failed to add income source: {} | payload={}",
@@ -42,6 +67,35 @@ async def add_new_income_source(category: IncomeSourceCreate):
         )
 
 
+@incomes_sources_router.patch("/{income_source_id}", response_model=IncomeSource)
+async def rename_income_source(income_source_id: str, income_source: IncomeSourceCreate):
+    logger.info("Renaming income source id={} to {}", income_source_id, income_source.name)
+
+    if not ObjectId.is_valid(income_source_id):
+        logger.warning("Invalid income source id received: {}", income_source_id)
+        raise HTTPException(status_code=400, detail="Invalid source income id")
+
+    try:
+        response = await mongo_client.update_one(
+            "income_source",
+            {"_id": ObjectId(income_source_id)},
+            {"$set": {"name": income_source.name, "name_key": name_key(income_source.name)}},
+        )
+    except DuplicateKeyError:
+        logger.warning("Income source already exists: {}", income_source.name)
+        raise HTTPException(status_code=409, detail=f"Income source {income_source.name} already exists")
+
+    if response.matched_count == 0:
+        logger.warning("Income source not found for rename: {}", income_source_id)
+        raise HTTPException(status_code=404, detail="Income source not found")
+
+    reference_cache.invalidate("income_source")
+    reference_reconciler.trigger()
+
+    logger.info("Income source renamed successfully: {}", income_source_id)
+    return IncomeSource(name=income_source.name, _id=income_source_id)
+
+
 @incomes_sources_router.delete("/{income_source_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_income_source(income_source_id: str):
     logger.info("Deleting income source with id={}", income_source_id)
@@ -55,6 +109,9 @@ async def delete_income_source(income_source_id: str):
         {"_id": ObjectId(income_source_id)}
     )
 
+    reference_cache.invalidate("income_source")
+    reference_reconciler.trigger()
+
     if response.deleted_count == 0:
         logger.warning("Income source not found for deletion: {}", income_source_id)
         raise HTTPException(status_code=404, detail="Income source not found")
@@ -1,59 +1,194 @@
-from typing import List
-from fastapi import APIRouter, HTTPException, status
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from bson import ObjectId
 from loguru import logger
 
+from app.db.cache import reference_cache
 from app.db.mongo_client import ExpenseManagerMongoClient
+from app.models.bulk import BulkDelete, BulkDeleteResult, BulkResult
 from app.models.income import Income, IncomeCreate
+from app.services.bulk import BulkSpec, build_delete_filter, bulk_delete, bulk_insert, iter_payload
+from app.services.rollups import add_to_rollups, remove_from_rollups
+from app.utils.conditional import check_not_modified
+from app.utils.filters import range_filter
+from app.utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NDJSON_MEDIA_TYPE,
+    NEXT_CURSOR_HEADER,
+    PAGE_SORT,
+    SortOrder,
+    keyset_filter,
+    ndjson_lines,
+    split_page,
+)
+from app.utils.serialization import json_list_response, list_response_model, select_fields
+from app.utils.utils import embed_reference
 
 incomes_router = APIRouter()
 mongo_client = ExpenseManagerMongoClient()
 
+INCOMES_BULK = BulkSpec(
+    collection="incomes",
+    create_model=IncomeCreate,
+    name_field="source_name",
+    reference_collection="income_source",
+    reference_field="source",
+    reference_label="Income source",
+)
 
-@incomes_router.get("/all", response_model=List[Income])
-async def get_all_incomes():
-    logger.info("Fetching all incomes")
-    return await mongo_client.get_many_records(collection="incomes")
+FIELDS_DESCRIPTION = "Comma separated fields to return, e.g. amount,date,source.name"
 
 
-@incomes_router.get("/{source}", response_model=List[Income])
-async def get_incomes_by_source(source: str):
-    logger.info("Fetching incomes by source: {}", source)
-    income_source = await mongo_client.get_one_record(
-        collection="income_source",
-        find_obj={"source": {"$regex": f"^{source}$", "$options": "i"}}
+def get_projection(fields: Optional[str], sort_field: str = "date"):
+    # The sort field is always fetched because page cursors are built from it
+    try:
+        return select_fields(Income, fields, required=(sort_field,))
+    except ValueError as exc:
+        logger.warning("Invalid incomes fields requested: {}", fields)
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+def get_filter(date_from: Optional[datetime],
+               date_to: Optional[datetime],
+               min_amount: Optional[float],
+               max_amount: Optional[float]) -> dict:
+    try:
+        return range_filter(date_from, date_to, min_amount, max_amount)
+    except ValueError as exc:
+        logger.warning("Invalid incomes range: {}", exc)
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@incomes_router.get("/all", response_model=list_response_model(Income))
+async def get_all_incomes(
+    request: Request,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    fields: Optional[str] = Query(default=None, description=FIELDS_DESCRIPTION),
+    date_from: Optional[datetime] = Query(default=None, alias="from"),
+    date_to: Optional[datetime] = Query(default=None, alias="to"),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    sort: Optional[SortOrder] = None,
+):
+    logger.info(
+        "Fetching all incomes: limit={}, cursor={}, stream={}, fields={}, from={}, to={}, amount=[{}, {}], sort={}",
+        limit,
+        cursor,
+        stream,
+        fields,
+        date_from,
+        date_to,
+        min_amount,
+        max_amount,
+        sort,
+    )
+
+    find_obj = get_filter(date_from, date_to, min_amount, max_amount)
+    page_sort = sort.spec if sort else PAGE_SORT
+    try:
+        find_obj = keyset_filter(cursor, find_obj, page_sort)
+    except ValueError:
+        logger.warning("Invalid incomes cursor received: {}", cursor)
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    projection, projector = get_projection(fields, page_sort[0][0])
+
+    not_modified, cache_headers = await check_not_modified(request, "incomes")
+    if not_modified is not None:
+        return not_modified
+
+    if stream:
+        records = mongo_client.iter_records(
+            collection="incomes",
+            projection=projection,
+            find_obj=find_obj,
+            sort=page_sort,
+            limit=limit or 0,
+            read_only=True,
+        )
+        return StreamingResponse(
+            ndjson_lines(records, projector),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=cache_headers,
+        )
+
+    if limit is None and cursor is None:
+        # Without an explicit order the natural order is kept, sorting a full scan costs more than it saves
+        incomes = await mongo_client.get_many_records(
+            collection="incomes",
+            projection=projection,
+            find_obj=find_obj,
+            sort=sort.spec if sort else None,
+            read_only=True,
+        )
+        return json_list_response(incomes, projector, headers=cache_headers)
+
+    limit = limit or DEFAULT_PAGE_SIZE
+    incomes = await mongo_client.get_many_records(
+        collection="incomes",
+        projection=projection,
+        find_obj=find_obj,
+        sort=page_sort,
+        limit=limit + 1,
+        read_only=True,
     )
+    incomes, next_cursor = split_page(incomes, limit, page_sort)
+    headers = {**cache_headers, NEXT_CURSOR_HEADER: next_cursor} if next_cursor else cache_headers
+
+    return json_list_response(incomes, projector, headers=headers)
+
+
+@incomes_router.get("/{source}", response_model=list_response_model(Income))
+async def get_incomes_by_source(
+    source: str,
+    fields: Optional[str] = Query(default=None, description=FIELDS_DESCRIPTION),
+    date_from: Optional[datetime] = Query(default=None, alias="from"),
+    date_to: Optional[datetime] = Query(default=None, alias="to"),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    sort: Optional[SortOrder] = None,
+):
+    logger.info("Fetching incomes by source: {}", source)
+    find_obj = get_filter(date_from, date_to, min_amount, max_amount)
+    projection, projector = get_projection(fields)
+    income_source = await reference_cache.get_by_name("income_source", source)
     if not income_source:
         logger.warning("Income source not found: {}", source)
         raise HTTPException(status_code=404, detail=f"No incomes found for source: {source}")
 
     incomes = await mongo_client.get_many_records(
         collection="incomes",
-        find_obj={"income_source._id": ObjectId(income_source["_id"])},
+        projection=projection,
+        find_obj={**find_obj, "source._id": ObjectId(income_source["_id"])},
+        sort=sort.spec if sort else None,
+        read_only=True,
     )
     logger.info("Fetched {} incomes for source {}", len(incomes), source)
-    return incomes
+    return json_list_response(incomes, projector)
 
 
 @incomes_router.post("/add", response_model=Income, status_code=status.HTTP_201_CREATED)
 async def add_new_income(income: IncomeCreate):
     logger.info("Adding new income: {}", income.source_name)
-    income_source = await mongo_client.get_one_record(
-        collection="income_source",
-        find_obj={"name": {"$regex": f"^{income.source_name}$", "$options": "i"}}
-    )
+    income_source = await reference_cache.get_by_name("income_source", income.source_name)
     if not income_source:
         logger.warning("Income source not found: {}", income.source_name)
         raise HTTPException(status_code=404, detail=f"Income source {income.source_name} not found")
 
     income_dict = income.model_dump()
-    income_dict["source"] = income_source
+    income_dict["source"] = embed_reference(income_source)
     income_dict.pop("source_name")
     try:
         response = await mongo_client.insert_one(
             collection="incomes",
             data=income_dict
         )
+        await add_to_rollups("incomes", [income_dict])
         logger.info(
             "Income added successfully: {} (id={})",
             income.source_name,
@@ -69,6 +204,23 @@ async def add_new_income(income: IncomeCreate):
         raise HTTPException(status_code=500, detail="Failed to add income")
 
 
+@incomes_router.post("/bulk", response_model=BulkResult)
+async def add_incomes_bulk(request: Request):
+    logger.info("Adding incomes in bulk")
+    result = await bulk_insert(INCOMES_BULK, iter_payload(request))
+    logger.info("Bulk incomes added: created={}, failed={}", result["created"], result["failed"])
+    return result
+
+
+@incomes_router.post("/bulk/delete", response_model=BulkDeleteResult)
+async def delete_incomes_bulk(criteria: BulkDelete):
+    logger.info("Deleting incomes in bulk: {}", criteria)
+    find_obj = await build_delete_filter(INCOMES_BULK, criteria)
+    deleted = await bulk_delete(INCOMES_BULK, find_obj)
+    logger.info("Bulk incomes deleted: {}", deleted)
+    return {"deleted": deleted}
+
+
 @incomes_router.delete("/{income_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_income(income_id: str):
     logger.info("Deleting income with id={}", income_id)
@@ -77,11 +229,17 @@ async def delete_income(income_id: str):
         logger.warning("Invalid income id: {}", income_id)
         raise HTTPException(status_code=400, detail="Invalid income id")
 
-    response = await mongo_client.delete_one("incomes", {"_id": ObjectId(income_id)})
+    income = await mongo_client.find_one_and_delete(
+        "incomes",
+        {"_id": ObjectId(income_id)},
+        projection={"date": 1, "amount": 1, "source": 1},
+    )
 
-    if response.deleted_count == 0:
+    if income is None:
         logger.warning("Income not found for deletion: {}", income_id)
         raise HTTPException(status_code=404, detail="Income not found")
 
+    await remove_from_rollups("incomes", [income])
+
     logger.info("Income deleted successfully: {}", income_id)
     return {"message": "Income deleted successfully", "id": income_id}
\ No newline at end of file
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.db.cache import reference_cache
+from app.services.events import event_broker
+from app.services.webhook_queue import webhook_queue
+
+metrics_router = APIRouter()
+
+
+class ReferenceCacheCollector:
+    def collect(self):
+        stats = reference_cache.stats()
+        yield CounterMetricFamily("reference_cache_hits", "Reference cache hits", value=stats["hits"])
+        yield CounterMetricFamily("reference_cache_misses", "Reference cache misses", value=stats["misses"])
+        yield GaugeMetricFamily("reference_cache_size", "Documents held by the reference cache", value=stats["size"])
+
+
+class WebhookQueueCollector:
+    def collect(self):
+        yield CounterMetricFamily("webhook_items_processed", "Webhook items stored", value=webhook_queue.processed)
+        yield CounterMetricFamily("webhook_items_retried", "Webhook item retries", value=webhook_queue.retried)
+        yield CounterMetricFamily("webhook_items_failed", "Webhook items given up on", value=webhook_queue.failed)
+        if webhook_queue.last_batch_lag is not None:
+            yield GaugeMetricFamily(
+                "webhook_last_batch_lag_seconds",
+                "Longest enqueue-to-store delay in the last processed batch",
+                value=webhook_queue.last_batch_lag,
+            )
+
+
+class EventBrokerCollector:
+    def collect(self):
+        stats = event_broker.stats()
+        yield GaugeMetricFamily("events_subscribers", "Connected /events clients", value=stats["subscribers"])
+        yield CounterMetricFamily("events_published", "Change events fanned out to clients", value=stats["published"])
+        yield CounterMetricFamily("events_resets", "Reset events sent to lagging or expired clients", value=stats["resets"])
+
+
+REGISTRY.register(ReferenceCacheCollector())
+REGISTRY.register(WebhookQueueCollector())
+REGISTRY.register(EventBrokerCollector())
+
+
+@metrics_router.get("", include_in_schema=False)
+async def get_metrics():
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -1,199 +1,99 @@
-import monobank
 import datetime
-import requests
-
 import os
+from typing import List, Optional
+
 from dotenv import load_dotenv
 
-from fastapi import APIRouter
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Query, status
+from loguru import logger
+from pydantic import ValidationError
 
 from app.db.mongo_client import ExpenseManagerMongoClient
+from app.models.backfill import BackfillCreate, BackfillJob
+from app.models.webhook import QueueMetrics, WebhookData
 
-from app.utils.utils import get_category_from_mcc, internal_transfer
+from app.services import backfill
+from app.services.monobank_api import MonobankError, mono_api
+from app.services.webhook_queue import webhook_queue
 
 expenses_mono_router = APIRouter()
 mongo_client = ExpenseManagerMongoClient()
 
 load_dotenv()
-mono_client = monobank.Client(os.environ.get("MONO_API_TOKEN"))
-url = os.environ.get("URL")
-app_url = os.environ['VERCEL_PROJECT_PRODUCTION_URL']
-
-def is_internal(description: str) -> bool:
-    return any(keyword in description for keyword in internal_transfer)
-
-def fetch_transactions(days):
-    today = datetime.datetime.now()
-    start = today - datetime.timedelta(days=days)
-
-    # TODO: think about getting account id
-    accounts = mono_client.get_client_info()["accounts"]
-    print(accounts)
-    account_id = accounts[2]["id"]
-
-    return mono_client.get_statements("iyHAALcQj20XvTp6-XvjGw", start, today)
-
-
-async def is_duplicate_expense(date, amount, description):
-    return await mongo_client.get_one_record(
-        "expenses",
-        {"date": date, "amount": amount, "comment": description}
-    )
-
-
-async def is_duplicate_income(date, amount):
-    return await mongo_client.get_one_record(
-        "incomes",
-        {"date": date, "amount": amount}
-    )
-
-
-@expenses_mono_router.post("/import")
-async def import_transactions():
-    inserted_exp = 0
-    inserted_inc = 0
-    skipped_dupes = 0
-    skipped_transfers = 0
-
-    raw_data = fetch_transactions(1)
-    for transaction in raw_data:
-        description = transaction.get("description", "")
-        raw_amount = transaction["amount"] / 100
-        date = datetime.datetime.fromtimestamp(transaction["time"])
-        mcc = transaction.get("mcc", 0)
-        category_from_mcc = get_category_from_mcc(mcc)
-
-        if raw_amount < 0:
-            if any(keyword in description for keyword in internal_transfer):
-                skipped_transfers += 1
-                continue
-            amount = abs(raw_amount)
-            category = await mongo_client.get_one_record(
-                "categories",
-                {"name": {"$regex": f"^{category_from_mcc}$", "$options": "i"}}
-            )
-
-            if not category:
-                insert_cat = await mongo_client.insert_one(
-                    "categories", {"name": category_from_mcc}
-                )
-                category = {"_id": insert_cat.inserted_id, "name": category_from_mcc}
-
-            if await is_duplicate_expense(date, amount, description):
-                skipped_dupes += 1
-                continue
-
-            expense_dict = {
-                "amount": amount,
-                "date": date,
-                "comment": description,
-                "category": category,
-            }
-            await mongo_client.insert_one("expenses", expense_dict)
-            inserted_exp += 1
-            continue
-
-        else:
-            amount = raw_amount
-
-            # TODO: remove this
-            if transaction.get("counterName", None) == os.environ.get("PHRASE"):
-                source_name = "Salary"
-            else:
-                source_name = "Present"
-
-            source = await mongo_client.get_one_record(
-                "income_source",
-                {"name": {"$regex": f"^{source_name}$", "$options": "i"}}
-            )
-
-            if not source:
-                new_src = await mongo_client.insert_one(
-                    "income_source", {"name": source_name}
-                )
-                source = {"_id": new_src.inserted_id, "name": source_name}
-
-            if await is_duplicate_income(date, amount):
-                skipped_dupes += 1
-                continue
-
-            income_doc = {
-                "amount": amount,
-                "date": date,
-                "source": source,
-            }
-
-            await mongo_client.insert_one("incomes", income_doc)
-            inserted_inc += 1
-
-    return {
-        "inserted_expenses": inserted_exp,
-        "inserted_incomes": inserted_inc,
-        "skipped_duplicates": skipped_dupes,
-        "skipped_transfers": skipped_transfers,
-        "total_received": len(raw_data),
-    }
+
+
+@expenses_mono_router.post("/import", status_code=status.HTTP_202_ACCEPTED, response_model=BackfillJob)
+async def import_transactions(
+    days: int = Query(default=1, ge=1, le=31),
+    accounts: Optional[List[str]] = Query(default=None, description="Account ids, every account when omitted"),
+):
+    """Import the last ``days`` as a backfill job, poll ``/backfill/{id}`` for its progress.
+
+    Statement calls are spaced by the rate limit, a minute by default, which is too long to wait for
+    within the request.
+    """
+    date_from = datetime.datetime.now() - datetime.timedelta(days=days)
+    logger.info("Starting import: from={}, accounts={}", date_from, accounts)
+    job = await backfill.create_job(date_from, accounts=accounts)
+    backfill.start_job(str(job["_id"]))
+    return job
+
+
+@expenses_mono_router.post("/backfill", status_code=status.HTTP_202_ACCEPTED, response_model=BackfillJob)
+async def start_backfill(request: BackfillCreate):
+    logger.info("Starting backfill: from={}, to={}", request.date_from, request.date_to)
+    job = await backfill.create_job(request.date_from, request.date_to, request.accounts)
+    backfill.start_job(str(job["_id"]))
+    return job
+
+
+@expenses_mono_router.get("/backfill/{job_id}", response_model=BackfillJob)
+async def get_backfill(job_id: str):
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid backfill id")
+
+    job = await backfill.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Backfill not found")
+    return job
+
+
+@expenses_mono_router.post("/backfill/{job_id}/resume", status_code=status.HTTP_202_ACCEPTED, response_model=BackfillJob)
+async def resume_backfill(job_id: str):
+    logger.info("Resuming backfill {}", job_id)
+    job = await get_backfill(job_id)
+
+    if backfill.is_running(job_id):
+        raise HTTPException(status_code=409, detail="Backfill is already running")
+    if job["status"] == "completed":
+        raise HTTPException(status_code=409, detail="Backfill is already completed")
+
+    backfill.start_job(job_id)
+    return job
+
 
 @expenses_mono_router.post("/webhook")
 async def post_webhook(body: dict):
-    print(f"Webhook received{body}")
+    logger.info("Webhook received: {}", body.get("type"))
     if body.get("type") != "StatementItem":
         return {"status": "ignored"}
 
-    transaction = body["data"]["statementItem"]
-    description = transaction.get("description", "")
-    raw_amount = transaction["amount"] / 100
-    date = datetime.datetime.fromtimestamp(transaction["time"])
-    mcc = transaction.get("mcc", 0)
-    category_from_mcc = get_category_from_mcc(mcc)
-
-    if is_internal(description):
-        return {"status": "skipped_transaction"}
-
-    if raw_amount < 0:
-        amount = abs(raw_amount)
-        category = await mongo_client.get_one_record(
-            "categories",
-            {"name": {"$regex": f"^{category_from_mcc}$", "$options": "i"}}
-        )
-
-        if not category:
-            insert_cat = await mongo_client.insert_one(
-                "categories", {"name": category_from_mcc}
-            )
-            category = {"_id": insert_cat.inserted_id, "name": category_from_mcc}
-
-        expense_dict = {
-            "amount": amount,
-            "date": date,
-            "comment": description,
-            "category": category,
-        }
-        await mongo_client.insert_one("expenses", expense_dict)
-    else:
-        if transaction.get("counterName", None) == os.environ.get("PHRASE"):
-            source_name = "Salary"
-        else:
-            source_name = "Present"
-
-        source = await mongo_client.get_one_record(
-            "income_source",
-            {"name": {"$regex": f"^{source_name}$", "$options": "i"}}
-        )
-
-        if not source:
-            new_src = await mongo_client.insert_one(
-                "income_source", {"name": source_name}
-            )
-            source = {"_id": new_src.inserted_id, "name": source_name}
-
-        income_doc = {
-            "amount": raw_amount,
-            "date": date,
-            "source": source,
-        }
-
-        await mongo_client.insert_one("incomes", income_doc)
+    try:
+        data = WebhookData.model_validate(body.get("data"))
+    except ValidationError as exc:
+        logger.warning("Invalid webhook payload: {}", exc)
+        raise HTTPException(status_code=400, detail="Invalid statement item payload")
+
+    item = data.statementItem.model_dump()
+    if not await webhook_queue.enqueue(data.account, item):
+        return {"status": "duplicate", "id": item["id"]}
+    return {"status": "queued", "id": item["id"]}
+
+
+@expenses_mono_router.get("/webhook/metrics", response_model=QueueMetrics)
+async def get_webhook_metrics():
+    return await webhook_queue.metrics()
 
 
 @expenses_mono_router.get("/webhook")
@@ -202,10 +102,14 @@ async def get_webhook():
 
 @expenses_mono_router.post("/set-webhook")
 async def set_webhook():
-    reg_webhook = requests.post(
-        url,
-        headers={"X-Token": os.getenv("MONO_API_TOKEN")},
-        json={"webHookUrl": f"https://{app_url}/expenses_mono/webhook"}
-    )
+    app_url = os.environ.get("VERCEL_PROJECT_PRODUCTION_URL")
+    if not app_url:
+        logger.error("VERCEL_PROJECT_PRODUCTION_URL is not set, cannot register webhook")
+        raise HTTPException(status_code=500, detail="VERCEL_PROJECT_PRODUCTION_URL is not configured")
+
+    try:
+        reg_webhook = await mono_api.set_webhook(f"https://{app_url}/expenses_mono/webhook")
+    except MonobankError as exc:
+        raise HTTPException(status_code=502, detail=f"Monobank request failed: {exc}")
 
     return {"status": reg_webhook.status_code, "response": reg_webhook.text}
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, status
+from loguru import logger
+
+from app.services.reconciler import reference_reconciler
+
+reconcile_router = APIRouter()
+
+
+@reconcile_router.post("", status_code=status.HTTP_202_ACCEPTED)
+async def start_reconcile():
+    logger.info("Reference reconciliation requested")
+    reference_reconciler.trigger()
+    return {"status": "scheduled"}
+
+
+@reconcile_router.get("/status")
+async def get_reconcile_status():
+    return reference_reconciler.status
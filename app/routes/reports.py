@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from loguru import logger
+
+from app.db.mongo_client import ExpenseManagerMongoClient
+from app.models.report import Granularity, MonthlyRollups, Summary
+from app.services.rollups import get_rollups
+from app.utils.utils import to_naive_local
+
+reports_router = APIRouter()
+mongo_client = ExpenseManagerMongoClient()
+
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+
+@reports_router.get("/summary", response_model=Summary)
+async def get_summary(
+    date_from: Optional[datetime] = Query(default=None, alias="from"),
+    date_to: Optional[datetime] = Query(default=None, alias="to"),
+    granularity: Granularity = Granularity.month,
+):
+    # Aware bounds would not compare with the naive defaults and stored dates
+    date_from, date_to = to_naive_local(date_from), to_naive_local(date_to)
+    now = datetime.now()
+    date_from = date_from or now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    date_to = date_to or now
+
+    if date_from >= date_to:
+        logger.warning("Invalid summary range: from={}, to={}", date_from, date_to)
+        raise HTTPException(status_code=400, detail="'from' must be earlier than 'to'")
+
+    logger.info(
+        "Building summary: from={}, to={}, granularity={}",
+        date_from,
+        date_to,
+        granularity.value,
+    )
+
+    expenses, incomes = await asyncio.gather(
+        mongo_client.get_period_totals(
+            collection="expenses",
+            group_by="category.name",
+            date_from=date_from,
+            date_to=date_to,
+            granularity=granularity.value,
+        ),
+        mongo_client.get_period_totals(
+            collection="incomes",
+            group_by="source.name",
+            date_from=date_from,
+            date_to=date_to,
+            granularity=granularity.value,
+        ),
+    )
+
+    return Summary(
+        date_from=date_from,
+        date_to=date_to,
+        granularity=granularity,
+        total_expenses=sum(bucket["total"] for bucket in expenses),
+        total_incomes=sum(bucket["total"] for bucket in incomes),
+        expenses=expenses,
+        incomes=incomes,
+    )
+
+
+@reports_router.get("/monthly", response_model=MonthlyRollups)
+async def get_monthly(
+    month_from: Optional[str] = Query(default=None, alias="from", pattern=MONTH_PATTERN),
+    month_to: Optional[str] = Query(default=None, alias="to", pattern=MONTH_PATTERN),
+):
+    if month_from is not None and month_to is not None and month_from > month_to:
+        logger.warning("Invalid monthly range: from={}, to={}", month_from, month_to)
+        raise HTTPException(status_code=400, detail="'from' must not be later than 'to'")
+
+    logger.info("Reading monthly rollups: from={}, to={}", month_from, month_to)
+    expenses, incomes = await asyncio.gather(
+        get_rollups("expenses", month_from, month_to),
+        get_rollups("incomes", month_from, month_to),
+    )
+    return MonthlyRollups(expenses=expenses, incomes=incomes)
@@ -0,0 +1,165 @@
+import asyncio
+import datetime
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from loguru import logger
+
+from app.db.mongo_client import ExpenseManagerMongoClient
+from app.services.mono_import import import_statement
+from app.services.monobank_api import MonobankError, mono_api
+
+mongo_client = ExpenseManagerMongoClient()
+
+BACKFILL_COLLECTION = "backfill_jobs"
+# Longest period a single statement request may cover
+STATEMENT_WINDOW = datetime.timedelta(days=31)
+# Statement responses are truncated to this many items, the rest needs another request
+STATEMENT_PAGE_LIMIT = 500
+RATE_LIMIT_RETRIES = 3
+TOO_MANY_REQUESTS = 429
+
+_running: Dict[str, asyncio.Task] = {}
+
+
+class RateLimiter:
+    """Spaces calls at least ``interval`` seconds apart across all coroutines"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_call = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            delay = self._next_call - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_call = time.monotonic() + self.interval
+
+
+statement_limiter = RateLimiter(float(os.environ.get("MONO_STATEMENT_INTERVAL", 60)))
+
+
+def split_windows(date_from: datetime.datetime,
+                  date_to: datetime.datetime,
+                  window: datetime.timedelta = STATEMENT_WINDOW) -> Iterator[Tuple[datetime.datetime, datetime.datetime]]:
+    start = date_from
+    while start < date_to:
+        end = min(start + window, date_to)
+        yield start, end
+        start = end
+
+
+async def get_statements(account: str, start: datetime.datetime, end: datetime.datetime) -> List[dict]:
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        await statement_limiter.wait()
+        try:
+            return await mono_api.get_statements(account, start, end)
+        except MonobankError as exc:
+            if exc.status_code != TOO_MANY_REQUESTS or attempt == RATE_LIMIT_RETRIES:
+                raise
+            logger.warning("Monobank rate limit hit for account {}, retry {}", account, attempt + 1)
+
+
+async def resolve_accounts(accounts: Optional[List[str]] = None) -> List[str]:
+    """The given account ids, or every account of the client when none are given"""
+    if accounts:
+        return list(accounts)
+    client_info = await mono_api.get_client_info()
+    return [account["id"] for account in client_info["accounts"]]
+
+
+async def fetch_window(account: str, start: datetime.datetime, end: datetime.datetime) -> List[dict]:
+    """Fetch every transaction of ``account`` in the window, following truncated responses"""
+    transactions: Dict[str, dict] = {}
+    while True:
+        batch = await get_statements(account, start, end)
+        for item in batch:
+            transactions.setdefault(item["id"], item)
+        if len(batch) < STATEMENT_PAGE_LIMIT:
+            return list(transactions.values())
+        # Items come newest first. Continue from the second of the oldest one received, the page may
+        # have been cut among items of that second; the ones already received are dropped above.
+        oldest = min(item["time"] for item in batch)
+        if oldest >= int(end.timestamp()):
+            logger.warning(
+                "Statement page of account {} holds {} items of one second, the rest of it cannot be fetched",
+                account, len(batch),
+            )
+            return list(transactions.values())
+        end = datetime.datetime.fromtimestamp(oldest)
+
+
+async def create_job(date_from: datetime.datetime,
+                     date_to: Optional[datetime.datetime] = None,
+                     accounts: Optional[List[str]] = None) -> dict:
+    now = datetime.datetime.now()
+    job = {
+        "status": "pending",
+        "date_from": date_from,
+        "date_to": date_to or now,
+        "accounts": {account: date_from for account in accounts or []},
+        "counters": {},
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+    response = await mongo_client.insert_one(BACKFILL_COLLECTION, job)
+    job["_id"] = response.inserted_id
+    return job
+
+
+async def get_job(job_id: str) -> Optional[dict]:
+    return await mongo_client.get_one_record(BACKFILL_COLLECTION, {"_id": ObjectId(job_id)})
+
+
+async def _update_job(job_id: ObjectId, update: dict) -> None:
+    update.setdefault("$set", {})["updated_at"] = datetime.datetime.now()
+    await mongo_client.update_one(BACKFILL_COLLECTION, {"_id": job_id}, update)
+
+
+async def run_job(job_id: str) -> None:
+    """Walk every account window by window, checkpointing after each window so a rerun resumes"""
+    job = await get_job(job_id)
+    await _update_job(job["_id"], {"$set": {"status": "running", "error": None}})
+
+    try:
+        accounts = job["accounts"]
+        if not accounts:
+            accounts = {account: job["date_from"] for account in await resolve_accounts()}
+            await _update_job(job["_id"], {"$set": {"accounts": accounts}})
+
+        for account, checkpoint in accounts.items():
+            for start, end in split_windows(checkpoint, job["date_to"]):
+                transactions = await fetch_window(account, start, end)
+                result = await import_statement(transactions)
+                logger.info("Backfilled {} {} - {}: {}", account, start, end, result)
+
+                counters = {f"counters.{name}": value for name, value in result.items()}
+                counters["counters.windows"] = 1
+                await _update_job(job["_id"], {
+                    "$set": {f"accounts.{account}": end},
+                    "$inc": counters,
+                })
+
+        await _update_job(job["_id"], {"$set": {"status": "completed"}})
+        logger.info("Backfill {} completed", job_id)
+    except Exception as exc:
+        logger.exception("Backfill {} failed", job_id)
+        await _update_job(job["_id"], {"$set": {"status": "failed", "error": str(exc)}})
+
+
+def is_running(job_id: str) -> bool:
+    task = _running.get(job_id)
+    return task is not None and not task.done()
+
+
+def start_job(job_id: str) -> asyncio.Task:
+    """Run the job in the background, the task reference is kept until it finishes"""
+    task = asyncio.create_task(run_job(job_id))
+    _running[job_id] = task
+    task.add_done_callback(lambda _: _running.pop(job_id, None))
+    return task
@@ -0,0 +1,221 @@
+import json
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, List, Optional, Tuple, Type
+
+from bson import ObjectId
+from fastapi import HTTPException, Request
+from loguru import logger
+from pydantic import BaseModel, ValidationError
+from pymongo.errors import BulkWriteError
+
+from app.db.mongo_client import ExpenseManagerMongoClient
+from app.models.bulk import BulkDelete
+from app.services.rollups import add_to_rollups, refresh_rollups, remove_from_rollups, rollup_keys
+from app.utils.pagination import NDJSON_MEDIA_TYPE
+from app.utils.utils import embed_reference, name_key
+
+mongo_client = ExpenseManagerMongoClient()
+
+# Items resolved, validated and written per round trip
+BULK_CHUNK_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class BulkSpec:
+    collection: str
+    create_model: Type[BaseModel]
+    # Field of ``create_model`` holding the reference name, e.g. ``category_name``
+    name_field: str
+    reference_collection: str
+    # Field of the stored document embedding the reference, e.g. ``category``
+    reference_field: str
+    reference_label: str
+
+
+@dataclass(frozen=True)
+class MalformedLine:
+    """Stands in for an NDJSON line that is not valid JSON, it is reported as that item's error"""
+    detail: str
+
+
+def _loads(raw: bytes) -> Any:
+    try:
+        return json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed JSON in request body")
+
+
+def _loads_line(raw: bytes) -> Any:
+    # Earlier chunks of the stream may be stored already, so a bad line must not fail the request
+    try:
+        return json.loads(raw)
+    except ValueError as exc:
+        return MalformedLine(f"Malformed JSON: {exc}")
+
+
+async def iter_payload(request: Request) -> AsyncIterator[Any]:
+    """Yield items of a JSON array body, or of an NDJSON body as it streams in.
+
+    NDJSON lines that do not parse are yielded as ``MalformedLine``.
+    """
+    if not request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+        payload = _loads(await request.body())
+        if not isinstance(payload, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array")
+        for item in payload:
+            yield item
+        return
+
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _loads_line(line)
+    if buffer.strip():
+        yield _loads_line(buffer)
+
+
+def _error(index: int, detail: str) -> dict:
+    return {"index": index, "status": "error", "detail": detail}
+
+
+async def _insert_chunk(spec: BulkSpec, chunk: List[Tuple[int, Any]]) -> List[dict]:
+    results = []
+    validated = []
+    for index, raw in chunk:
+        if isinstance(raw, MalformedLine):
+            results.append(_error(index, raw.detail))
+            continue
+        try:
+            validated.append((index, spec.create_model.model_validate(raw)))
+        except ValidationError as exc:
+            results.append(_error(index, str(exc)))
+
+    keys = list({name_key(getattr(item, spec.name_field)) for _, item in validated})
+    references = {
+        document["name_key"]: document
+        for document in await mongo_client.get_many_records(
+            collection=spec.reference_collection,
+            find_obj={"name_key": {"$in": keys}},
+        )
+    } if keys else {}
+
+    indexes, documents = [], []
+    for index, item in validated:
+        name = getattr(item, spec.name_field)
+        reference = references.get(name_key(name))
+        if reference is None:
+            results.append(_error(index, f"{spec.reference_label} {name} not found"))
+            continue
+        document = item.model_dump(exclude={spec.name_field})
+        document[spec.reference_field] = embed_reference(reference)
+        indexes.append(index)
+        documents.append(document)
+
+    if not documents:
+        return results
+
+    write_errors = {}
+    try:
+        await mongo_client.insert_many(spec.collection, documents, ordered=False)
+    except BulkWriteError as exc:
+        write_errors = {error["index"]: error["errmsg"] for error in exc.details["writeErrors"]}
+
+    await add_to_rollups(
+        spec.collection,
+        [document for position, document in enumerate(documents) if position not in write_errors],
+    )
+
+    for position, (index, document) in enumerate(zip(indexes, documents)):
+        if position in write_errors:
+            results.append(_error(index, write_errors[position]))
+        else:
+            results.append({"index": index, "status": "created", "id": str(document["_id"])})
+    return results
+
+
+async def bulk_insert(spec: BulkSpec, items: AsyncIterator[Any]) -> dict:
+    """Validate and store items chunk by chunk with one reference query and one insert_many per chunk"""
+    results = []
+    chunk = []
+    index = 0
+    async for item in items:
+        chunk.append((index, item))
+        index += 1
+        if len(chunk) == BULK_CHUNK_SIZE:
+            results.extend(await _insert_chunk(spec, chunk))
+            chunk = []
+    if chunk:
+        results.extend(await _insert_chunk(spec, chunk))
+
+    results.sort(key=lambda result: result["index"])
+    created = sum(1 for result in results if result["status"] == "created")
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+
+async def build_delete_filter(spec: BulkSpec, criteria: BulkDelete) -> dict:
+    """Translate bulk delete criteria into a query, refusing an empty one"""
+    find_obj = {}
+    if criteria.ids is not None:
+        if not all(ObjectId.is_valid(_id) for _id in criteria.ids):
+            raise HTTPException(status_code=400, detail="Invalid id in ids")
+        find_obj["_id"] = {"$in": [ObjectId(_id) for _id in criteria.ids]}
+
+    date_range = {}
+    if criteria.date_from is not None:
+        date_range["$gte"] = criteria.date_from
+    if criteria.date_to is not None:
+        date_range["$lt"] = criteria.date_to
+    if date_range:
+        find_obj["date"] = date_range
+
+    if criteria.name is not None:
+        reference: Optional[dict] = await mongo_client.get_one_record(
+            spec.reference_collection, {"name_key": name_key(criteria.name)}
+        )
+        if reference is None:
+            raise HTTPException(status_code=404, detail=f"{spec.reference_label} {criteria.name} not found")
+        find_obj[f"{spec.reference_field}._id"] = reference["_id"]
+
+    if not find_obj:
+        raise HTTPException(status_code=400, detail="Specify ids or at least one filter")
+    return find_obj
+
+
+async def _delete_chunk(spec: BulkSpec, documents: List[dict]) -> int:
+    response = await mongo_client.delete_many(
+        spec.collection, {"_id": {"$in": [document["_id"] for document in documents]}}
+    )
+    if response.deleted_count == len(documents):
+        await remove_from_rollups(spec.collection, documents)
+        return response.deleted_count
+
+    # Some were deleted concurrently and are already subtracted, recompute the touched buckets instead
+    logger.warning("Deleted {} of {} {}, refreshing rollups", response.deleted_count, len(documents), spec.collection)
+    try:
+        await refresh_rollups(spec.collection, rollup_keys(spec.collection, documents))
+    except Exception:
+        logger.exception("Failed to refresh {} rollups", spec.collection)
+    return response.deleted_count
+
+
+async def bulk_delete(spec: BulkSpec, find_obj: dict) -> int:
+    """Delete matching records chunk by chunk so the rollups can be adjusted with what was removed"""
+    deleted = 0
+    chunk = []
+    records = mongo_client.iter_records(
+        collection=spec.collection,
+        projection={"date": 1, "amount": 1, spec.reference_field: 1},
+        find_obj=find_obj,
+        batch_size=BULK_CHUNK_SIZE,
+    )
+    async for record in records:
+        chunk.append(record)
+        if len(chunk) == BULK_CHUNK_SIZE:
+            deleted += await _delete_chunk(spec, chunk)
+            chunk = []
+    if chunk:
+        deleted += await _delete_chunk(spec, chunk)
+    return deleted
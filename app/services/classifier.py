@@ -0,0 +1,304 @@
+import csv
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from string import Template
+from typing import AbstractSet, Dict, Iterable, List, Optional, Pattern, Set, Tuple
+
+from loguru import logger
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+MCC_CODES = 10_000
+# Distinct (direction, description, counterparty, ...) combinations whose rule outcome is remembered,
+# the memo is dropped when full; merchants repeat across statements, so most transactions skip the scan
+DECISION_CACHE_SIZE = 10_000
+
+ACTIONS = ("internal", "category", "source")
+DIRECTIONS = ("any", "debit", "credit")
+# Rules that only make sense for one side of a transaction
+ACTION_DIRECTIONS = {"category": "debit", "source": "credit"}
+
+
+@dataclass(frozen=True)
+class Rule:
+    action: str
+    field: str
+    keywords: Tuple[str, ...]
+    value: Optional[str] = None
+    match: str = "contains"
+    ignore_case: bool = False
+    direction: str = "any"
+
+    def applies_to(self, debit: bool) -> bool:
+        return self.direction == "any" or (self.direction == "debit") == debit
+
+
+@dataclass(frozen=True)
+class Classification:
+    internal: bool
+    category: Optional[str] = None
+    source: Optional[str] = None
+
+
+INTERNAL = Classification(internal=True)
+NO_MATCH: AbstractSet[int] = frozenset()
+NOT_DECIDED = object()
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """Alternation of ``keywords`` factored by common prefixes, preferring the longest match"""
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if "" not in node:
+            return body
+        return f"(?:{body})?" if len(branches) == 1 and len(body) > 1 else f"{body}?"
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Substring keywords of one field compiled into a single prefix-factored regex, a text is scanned once.
+
+    The lookahead reports the longest keyword at every start position. Any other keyword found at
+    that position is a prefix of it, so each keyword carries the rules of its keyword prefixes too
+    and every hit is reported.
+    """
+
+    def __init__(self, keywords: Dict[str, Set[int]], ignore_case: bool):
+        self.ignore_case = ignore_case
+        rules: Dict[str, Set[int]] = {}
+        for keyword, indexes in keywords.items():
+            rules.setdefault(self._key(keyword), set()).update(indexes)
+        self.rules: Dict[str, Set[int]] = {
+            keyword: set().union(*(rules.get(keyword[:end], NO_MATCH) for end in range(1, len(keyword) + 1)))
+            for keyword in rules
+        }
+        pattern = _trie_pattern(self.rules)
+        flags = re.IGNORECASE if ignore_case else 0
+        # A plain search rejects texts without any keyword far cheaper than scanning every position
+        self.first: Pattern = re.compile(pattern, flags)
+        self.every: Pattern = re.compile(f"(?=({pattern}))", flags)
+
+    def _key(self, text: str) -> str:
+        return text.lower() if self.ignore_case else text
+
+    def match(self, text: str) -> AbstractSet[int]:
+        if self.first.search(text) is None:
+            return NO_MATCH
+        matched: Set[int] = set()
+        for found in self.every.finditer(text):
+            matched |= self.rules[self._key(found.group(1))]
+        return matched
+
+
+def load_mcc_table(path: Path, default: str) -> List[str]:
+    """Flatten MCC ranges into a lookup list indexed by code, narrower ranges override wider ones"""
+    with path.open(newline="", encoding="utf-8") as file:
+        ranges = [(int(row["start"]), int(row["end"]), row["category"].strip().upper()) for row in csv.DictReader(file)]
+
+    table = [default] * MCC_CODES
+    for start, end, category in sorted(ranges, key=lambda item: item[1] - item[0], reverse=True):
+        if not 0 <= start <= end < MCC_CODES:
+            raise ValueError(f"Invalid MCC range {start}-{end} in {path}")
+        table[start:end + 1] = [category] * (end - start + 1)
+    return table
+
+
+def _expand(keyword: str) -> Optional[str]:
+    # ``${NAME}`` pulls a value from the environment and ``$$`` is a literal dollar;
+    # keywords referencing an unset variable are dropped
+    try:
+        return Template(keyword).substitute(os.environ) or None
+    except KeyError:
+        return None
+
+
+def parse_rules(raw: dict) -> List[Rule]:
+    rules = []
+    for position, item in enumerate(raw.get("rules", [])):
+        action = item["action"]
+        if action not in ACTIONS:
+            raise ValueError(f"Rule {position}: unknown action {action!r}")
+        if action != "internal" and not item.get("value"):
+            raise ValueError(f"Rule {position}: {action} rules need a value")
+        direction = item.get("direction", ACTION_DIRECTIONS.get(action, "any"))
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Rule {position}: unknown direction {direction!r}")
+        match = item.get("match", "contains")
+        if match not in ("contains", "exact"):
+            raise ValueError(f"Rule {position}: unknown match {match!r}")
+
+        keywords = tuple(keyword for keyword in map(_expand, item["keywords"]) if keyword)
+        if not keywords:
+            logger.warning("Classification rule {} has no usable keywords, skipped", position)
+            continue
+        rules.append(Rule(
+            action=action,
+            field=item.get("field", "description"),
+            keywords=keywords,
+            value=item.get("value"),
+            match=match,
+            ignore_case=item.get("ignore_case", False),
+            direction=direction,
+        ))
+    return rules
+
+
+class TransactionClassifier:
+    """Classifies Monobank statement items as internal transfers, expense categories or income sources.
+
+    Description and counterparty rules come from a JSON file, the first matching rule in file order
+    decides; expenses no rule decides on are categorized by the MCC table, a CSV of code ranges.
+    Both files are re-read when their modification time changes, checked at most every
+    ``reload_interval`` seconds.
+    """
+
+    def __init__(self, rules_path: Path, mcc_path: Path, reload_interval: float = 5.0):
+        self.rules_path = rules_path
+        self.mcc_path = mcc_path
+        self.reload_interval = reload_interval
+        self.rules: List[Rule] = []
+        self.mcc_table: List[str] = []
+        self._fields: Tuple[str, ...] = ()
+        self._matchers: List[Tuple[int, KeywordMatcher]] = []
+        self._exact: List[Tuple[int, bool, Dict[str, Set[int]]]] = []
+        self._mcc_results: List[Classification] = []
+        self._default_source = Classification(internal=False, source="Present")
+        self._results: Dict[Tuple[Optional[str], Optional[str]], Classification] = {}
+        self._decisions: Dict[tuple, Optional[Classification]] = {}
+        self._mtimes: Tuple[float, float] = (0.0, 0.0)
+        self._checked_at = 0.0
+
+    def _current_mtimes(self) -> Tuple[float, float]:
+        return self.rules_path.stat().st_mtime, self.mcc_path.stat().st_mtime
+
+    def _result(self, category: Optional[str] = None, source: Optional[str] = None) -> Classification:
+        # Classifications are immutable, one instance per outcome is shared by all transactions
+        key = (category, source)
+        if key not in self._results:
+            self._results[key] = Classification(internal=False, category=category, source=source)
+        return self._results[key]
+
+    def reload(self) -> None:
+        """Load and compile both files before replacing the current state, raises when they are invalid"""
+        mtimes = self._current_mtimes()
+        raw = json.loads(self.rules_path.read_text(encoding="utf-8"))
+        default_category = raw.get("default_category", "OTHER")
+        rules = parse_rules(raw)
+        mcc_table = load_mcc_table(self.mcc_path, default_category)
+
+        fields = tuple(sorted({rule.field for rule in rules}))
+        contains: Dict[Tuple[str, bool], Dict[str, Set[int]]] = {}
+        exact: Dict[Tuple[str, bool], Dict[str, Set[int]]] = {}
+        for index, rule in enumerate(rules):
+            target = exact if rule.match == "exact" else contains
+            keywords = target.setdefault((rule.field, rule.ignore_case), {})
+            for keyword in rule.keywords:
+                if rule.ignore_case and rule.match == "exact":
+                    keyword = keyword.lower()
+                keywords.setdefault(keyword, set()).add(index)
+
+        self._results = {}
+        self.rules, self.mcc_table, self._fields = rules, mcc_table, fields
+        self._matchers = [
+            (fields.index(field), KeywordMatcher(keywords, ignore_case))
+            for (field, ignore_case), keywords in contains.items()
+        ]
+        self._exact = [
+            (fields.index(field), ignore_case, values)
+            for (field, ignore_case), values in exact.items()
+        ]
+        self._mcc_results = [self._result(category=category) for category in mcc_table]
+        self._default_source = self._result(source=raw.get("default_source", "Present"))
+        self._decisions = {}
+        self._mtimes = mtimes
+        logger.info("Classification rules loaded: {} rules from {}, MCC table {}", len(rules), self.rules_path, self.mcc_path)
+
+    def reload_if_changed(self) -> None:
+        now = time.monotonic()
+        if self.mcc_table and now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            mtimes = self._current_mtimes()
+            if self.mcc_table and mtimes == self._mtimes:
+                return
+            # Recorded up front so a broken file is reported once rather than on every check
+            self._mtimes = mtimes
+            self.reload()
+        except (OSError, ValueError, KeyError) as exc:
+            if not self.mcc_table:
+                raise
+            logger.exception("Failed to reload classification rules, keeping the previous ones: {}", exc)
+
+    def _decide(self, key: tuple) -> Optional[Classification]:
+        """Outcome of the keyword rules for ``(debit, *values of self._fields)``, None when no rule applies"""
+        debit = key[0]
+        matched: Set[int] = set()
+        for position, matcher in self._matchers:
+            text = key[position + 1]
+            if text:
+                matched.update(matcher.match(text))
+        for position, ignore_case, keywords in self._exact:
+            text = key[position + 1]
+            if text:
+                matched.update(keywords.get(text.lower() if ignore_case else text, NO_MATCH))
+        if not matched:
+            return None
+
+        for index in sorted(matched):
+            rule = self.rules[index]
+            if not rule.applies_to(debit):
+                continue
+            if rule.action == "internal":
+                return INTERNAL
+            if rule.action == "category" and debit:
+                return self._result(category=rule.value)
+            if rule.action == "source" and not debit:
+                return self._result(source=rule.value)
+        return None
+
+    def classify(self, transaction: dict) -> Classification:
+        return self.classify_batch([transaction])[0]
+
+    def classify_batch(self, transactions: Iterable[dict]) -> List[Classification]:
+        """Classify a whole statement with one reload check; the loop is kept flat as it runs per transaction"""
+        self.reload_if_changed()
+        decisions, fields, mcc_results = self._decisions, self._fields, self._mcc_results
+        results = []
+        for transaction in transactions:
+            key = (transaction["amount"] < 0, *map(transaction.get, fields))
+            decided = decisions.get(key, NOT_DECIDED)
+            if decided is NOT_DECIDED:
+                if len(decisions) >= DECISION_CACHE_SIZE:
+                    decisions.clear()
+                decided = decisions[key] = self._decide(key)
+
+            if decided is None:
+                if key[0]:
+                    mcc = transaction.get("mcc", 0)
+                    decided = mcc_results[mcc if 0 <= mcc < MCC_CODES else 0]
+                else:
+                    decided = self._default_source
+            results.append(decided)
+        return results
+
+
+transaction_classifier = TransactionClassifier(
+    rules_path=Path(os.environ.get("CLASSIFIER_RULES_PATH", DATA_DIR / "classification_rules.json")),
+    mcc_path=Path(os.environ.get("CLASSIFIER_MCC_PATH", DATA_DIR / "mcc_categories.csv")),
+    reload_interval=float(os.environ.get("CLASSIFIER_RELOAD_INTERVAL", 5)),
+)
@@ -0,0 +1,215 @@
+import asyncio
+import os
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Optional, Set, Tuple, Type
+
+from loguru import logger
+from pydantic import BaseModel
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.db.mongo_client import ExpenseManagerMongoClient
+from app.models.category import Category
+from app.models.expense import Expense
+from app.models.income import Income
+from app.utils.serialization import compile_projector, dumps, field_paths
+
+mongo_client = ExpenseManagerMongoClient()
+
+# Collections pushed to clients and the models their documents are shaped by
+EVENT_MODELS: Dict[str, Type[BaseModel]] = {
+    "expenses": Expense,
+    "incomes": Income,
+    "categories": Category,
+}
+
+# Sent when a client missed events that can no longer be replayed, it should reload its lists
+RESET_EVENT = "reset"
+
+# Server error codes of a deployment without change streams and of a resume token past the oplog
+CHANGE_STREAMS_UNSUPPORTED = 40573
+CHANGE_STREAM_HISTORY_LOST = 286
+
+HEARTBEAT = b": keep-alive\n\n"
+
+Frame = Tuple[str, bytes]
+
+
+def _frame(event: str, data: dict, event_id: Optional[str] = None) -> bytes:
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {dumps(data).decode()}"]
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+def _pipeline() -> list:
+    # ``_id`` is the resume token and must be left as it is
+    return [
+        {"$match": {
+            "ns.coll": {"$in": list(EVENT_MODELS)},
+            "operationType": {"$in": ["insert", "replace", "update", "delete"]},
+        }},
+        {"$project": {
+            "operationType": 1,
+            "ns.coll": 1,
+            "documentKey": 1,
+            "fullDocument": 1,
+            "updateDescription.updatedFields": 1,
+            "updateDescription.removedFields": 1,
+        }},
+    ]
+
+
+class EventBroker:
+    """Fans out changes of expenses, incomes and categories to Server-Sent Events subscribers.
+
+    Each worker reads a single change stream, every change is encoded once and handed to all
+    subscriber queues. The last ``buffer_size`` frames are kept so a client reconnecting with
+    ``Last-Event-ID`` is replayed what it missed; older gaps and subscribers falling more than
+    ``queue_size`` events behind receive a ``reset`` event instead. Change streams need a replica
+    set, a single-node one is enough (``mongod --replSet rs0`` followed by ``rs.initiate()``).
+    """
+
+    def __init__(self,
+                 buffer_size: int = 1000,
+                 queue_size: int = 100,
+                 heartbeat_interval: float = 15.0,
+                 retry_interval: float = 1.0,
+                 max_retry_interval: float = 30.0):
+        self.buffer_size = buffer_size
+        self.queue_size = queue_size
+        self.heartbeat_interval = heartbeat_interval
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.published = 0
+        self.resets = 0
+        self.state = "stopped"
+        self._buffer: Deque[Frame] = deque(maxlen=buffer_size)
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._resume_token: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+        self._projectors = {collection: compile_projector(model) for collection, model in EVENT_MODELS.items()}
+        self._fields = {
+            collection: {path.split(".")[0] for path in field_paths(model)}
+            for collection, model in EVENT_MODELS.items()
+        }
+
+    def encode(self, change: dict) -> Optional[Frame]:
+        """SSE frame of a change with the document id and the fields clients know, None if only internal fields changed"""
+        collection = change["ns"]["coll"]
+        operation = change["operationType"]
+        data = {"collection": collection, "id": str(change["documentKey"]["_id"])}
+        if operation in ("insert", "replace"):
+            data["document"] = self._projectors[collection](change["fullDocument"])
+        elif operation == "update":
+            description = change.get("updateDescription", {})
+            fields = self._fields[collection]
+            data["updated"] = {
+                key: value for key, value in description.get("updatedFields", {}).items()
+                if key.split(".")[0] in fields
+            }
+            data["removed"] = [key for key in description.get("removedFields", []) if key.split(".")[0] in fields]
+            if not data["updated"] and not data["removed"]:
+                # Only internal fields such as ``name_key`` changed
+                return None
+        event_id = change["_id"]["_data"]
+        return event_id, _frame(operation, data, event_id)
+
+    def publish(self, event_id: str, frame: bytes) -> None:
+        self._buffer.append((event_id, frame))
+        self.published += 1
+        for queue in self._subscribers:
+            if queue.full():
+                self._reset(queue, "lagging")
+            else:
+                queue.put_nowait(frame)
+
+    def _reset(self, queue: asyncio.Queue, reason: str) -> None:
+        # The backlog is dropped, the client reloads its lists and continues from the latest event
+        while not queue.empty():
+            queue.get_nowait()
+        latest = self._buffer[-1][0] if self._buffer else None
+        queue.put_nowait(_frame(RESET_EVENT, {"reason": reason}, latest))
+        self.resets += 1
+
+    async def subscribe(self, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """Frames for one client, starting with the ones after ``last_event_id`` when it is still buffered"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        if last_event_id:
+            ids = [event_id for event_id, _ in self._buffer]
+            if last_event_id in ids:
+                missed = list(self._buffer)[ids.index(last_event_id) + 1:]
+                if len(missed) >= self.queue_size:
+                    self._reset(queue, "lagging")
+                else:
+                    for _, frame in missed:
+                        queue.put_nowait(frame)
+            else:
+                self._reset(queue, "expired")
+        self._subscribers.add(queue)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield HEARTBEAT
+        finally:
+            self._subscribers.discard(queue)
+
+    async def _watch(self) -> None:
+        async with mongo_client.watch(_pipeline(), resume_after=self._resume_token) as stream:
+            self.state = "open"
+            logger.info("Change stream opened, resume token {}", self._resume_token)
+            async for change in stream:
+                self._resume_token = change["_id"]
+                encoded = self.encode(change)
+                if encoded is not None:
+                    self.publish(*encoded)
+
+    async def _loop(self) -> None:
+        delay = self.retry_interval
+        while True:
+            try:
+                await self._watch()
+                delay = self.retry_interval
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as exc:
+                if exc.code == CHANGE_STREAMS_UNSUPPORTED:
+                    self.state = "unsupported"
+                    logger.error("Change streams are not supported by the deployment, /events is disabled: {}", exc)
+                    return
+                if exc.code == CHANGE_STREAM_HISTORY_LOST:
+                    logger.warning("Change stream resume token expired, starting from now")
+                    self._resume_token = None
+                    self._buffer.clear()
+                    for queue in self._subscribers:
+                        self._reset(queue, "expired")
+                    continue
+                logger.exception("Change stream failed, reopening in {}s", delay)
+            except PyMongoError:
+                logger.exception("Change stream failed, reopening in {}s", delay)
+            self.state = "retrying"
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self.state = "starting"
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.state = "stopped"
+
+    def stats(self) -> Dict[str, int]:
+        return {"subscribers": len(self._subscribers), "published": self.published, "resets": self.resets}
+
+
+event_broker = EventBroker(
+    buffer_size=int(os.environ.get("EVENTS_BUFFER_SIZE", 1000)),
+    queue_size=int(os.environ.get("EVENTS_QUEUE_SIZE", 100)),
+    heartbeat_interval=float(os.environ.get("EVENTS_HEARTBEAT_INTERVAL", 15)),
+)
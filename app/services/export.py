@@ -0,0 +1,123 @@
+import csv
+import io
+import zlib
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, List, Tuple
+
+# Rows serialized before a chunk is handed to the response
+EXPORT_CHUNK_ROWS = 1000
+
+
+@dataclass(frozen=True)
+class ExportSpec:
+    collection: str
+    reference_collection: str
+    reference_field: str
+    columns: Tuple[str, ...]
+    row: Callable[[dict], tuple]
+
+
+EXPENSES_EXPORT = ExportSpec(
+    collection="expenses",
+    reference_collection="categories",
+    reference_field="category",
+    columns=("id", "date", "amount", "comment", "category"),
+    row=lambda document: (
+        str(document["_id"]),
+        document["date"],
+        document["amount"],
+        document.get("comment", ""),
+        (document.get("category") or {}).get("name"),
+    ),
+)
+
+INCOMES_EXPORT = ExportSpec(
+    collection="incomes",
+    reference_collection="income_source",
+    reference_field="source",
+    columns=("id", "date", "amount", "source"),
+    row=lambda document: (
+        str(document["_id"]),
+        document["date"],
+        document["amount"],
+        (document.get("source") or {}).get("name"),
+    ),
+)
+
+
+async def _row_chunks(spec: ExportSpec, records: AsyncIterator[dict]) -> AsyncIterator[List[tuple]]:
+    rows = []
+    async for record in records:
+        rows.append(spec.row(record))
+        if len(rows) == EXPORT_CHUNK_ROWS:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+
+async def csv_chunks(spec: ExportSpec, records: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(spec.columns)
+    async for rows in _row_chunks(spec, records):
+        for row in rows:
+            writer.writerow(value.isoformat() if hasattr(value, "isoformat") else value for value in row)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file collecting what pyarrow writes until it is drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def parquet_chunks(spec: ExportSpec, records: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    """One Parquet row group per chunk of rows, bytes are yielded as soon as a group is written"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (column, pa.timestamp("ms") if column == "date" else pa.float64() if column == "amount" else pa.string())
+        for column in spec.columns
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        async for rows in _row_chunks(spec, records):
+            writer.write_table(pa.Table.from_pylist([dict(zip(spec.columns, row)) for row in rows], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,168 @@
+import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from bson import ObjectId
+from loguru import logger
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.db.mongo_client import ExpenseManagerMongoClient
+from app.services.classifier import transaction_classifier
+from app.services.rollups import add_to_rollups
+from app.utils.utils import embed_reference, name_key
+
+mongo_client = ExpenseManagerMongoClient()
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Fields records imported before ``mono_id`` existed were deduplicated on
+LEGACY_KEYS = {
+    "expenses": ("date", "amount", "comment"),
+    "incomes": ("date", "amount"),
+}
+
+
+async def resolve_references(collection: str, names: Iterable[str]) -> Dict[str, dict]:
+    """Find reference documents by name in one query, creating the missing ones; keyed by ``name_key``"""
+    names_by_key = {name_key(name): name for name in names}
+    if not names_by_key:
+        return {}
+
+    found = await mongo_client.get_many_records(
+        collection=collection,
+        find_obj={"name_key": {"$in": list(names_by_key)}},
+    )
+    resolved = {document["name_key"]: document for document in found}
+
+    missing = [
+        {"name": name, "name_key": key}
+        for key, name in names_by_key.items()
+        if key not in resolved
+    ]
+    if not missing:
+        return resolved
+
+    try:
+        await mongo_client.insert_many(collection, missing, ordered=False)
+        resolved.update((document["name_key"], document) for document in missing)
+    except BulkWriteError:
+        # Another request created some of them in the meantime
+        logger.warning("Concurrent insert into {} while resolving {}", collection, missing)
+        found = await mongo_client.get_many_records(
+            collection=collection,
+            find_obj={"name_key": {"$in": [document["name_key"] for document in missing]}},
+        )
+        resolved.update((document["name_key"], document) for document in found)
+    return resolved
+
+
+async def link_legacy(collection: str, documents: List[dict]) -> Tuple[List[dict], int]:
+    """Tag records stored before ``mono_id`` existed with their statement id instead of inserting a copy.
+
+    Within the date range of ``documents``, records without ``mono_id`` are matched on the fields the
+    former duplicate probe used, each at most once. Returns (documents still to insert, count linked).
+    """
+    if not documents:
+        return documents, 0
+    fields = LEGACY_KEYS[collection]
+    dates = [document["date"] for document in documents]
+    legacy = await mongo_client.get_many_records(
+        collection=collection,
+        projection={field: 1 for field in fields},
+        find_obj={"mono_id": {"$exists": False}, "date": {"$gte": min(dates), "$lte": max(dates)}},
+    )
+    if not legacy:
+        return documents, 0
+
+    unlinked: Dict[tuple, List[ObjectId]] = {}
+    for record in legacy:
+        unlinked.setdefault(tuple(record.get(field) for field in fields), []).append(record["_id"])
+    remaining, requests = [], []
+    for document in documents:
+        ids = unlinked.get(tuple(document[field] for field in fields))
+        if ids:
+            requests.append(UpdateOne(
+                {"_id": ids.pop(), "mono_id": {"$exists": False}},
+                {"$set": {"mono_id": document["mono_id"]}},
+            ))
+        else:
+            remaining.append(document)
+    if not requests:
+        return documents, 0
+
+    try:
+        await mongo_client.bulk_write(collection, requests, ordered=False)
+    except BulkWriteError as exc:
+        # The statement id is already stored on another record, the legacy copy is left as it is
+        if any(error["code"] != DUPLICATE_KEY_ERROR for error in exc.details["writeErrors"]):
+            raise
+    logger.info("Linked {} legacy {} to their statement ids", len(requests), collection)
+    return remaining, len(requests)
+
+
+async def insert_new(collection: str, documents: List[dict]) -> Tuple[List[dict], int]:
+    """Insert documents unordered, returns (inserted documents, count rejected by the unique ``mono_id`` index)"""
+    if not documents:
+        return [], 0
+    try:
+        await mongo_client.insert_many(collection, documents, ordered=False)
+        return documents, 0
+    except BulkWriteError as exc:
+        rejected = {error["index"] for error in exc.details["writeErrors"] if error["code"] == DUPLICATE_KEY_ERROR}
+        if len(rejected) != len(exc.details["writeErrors"]):
+            raise
+        return [document for index, document in enumerate(documents) if index not in rejected], len(rejected)
+
+
+async def import_statement(transactions: List[dict]) -> dict:
+    """Store a Monobank statement with a fixed number of round trips regardless of its size"""
+    skipped_transfers = 0
+    expenses = []
+    incomes = []
+
+    for transaction, classification in zip(transactions, transaction_classifier.classify_batch(transactions)):
+        if classification.internal:
+            skipped_transfers += 1
+            continue
+
+        raw_amount = transaction["amount"] / 100
+        date = datetime.datetime.fromtimestamp(transaction["time"])
+
+        if raw_amount < 0:
+            expenses.append({
+                "mono_id": transaction["id"],
+                "amount": abs(raw_amount),
+                "date": date,
+                "comment": transaction.get("description", ""),
+                "category": classification.category,
+            })
+        else:
+            incomes.append({
+                "mono_id": transaction["id"],
+                "amount": raw_amount,
+                "date": date,
+                "source": classification.source,
+            })
+
+    categories = await resolve_references("categories", {expense["category"] for expense in expenses})
+    sources = await resolve_references("income_source", {income["source"] for income in incomes})
+
+    for expense in expenses:
+        expense["category"] = embed_reference(categories[name_key(expense["category"])])
+    for income in incomes:
+        income["source"] = embed_reference(sources[name_key(income["source"])])
+
+    expenses, linked_exp = await link_legacy("expenses", expenses)
+    incomes, linked_inc = await link_legacy("incomes", incomes)
+    inserted_exp, skipped_exp = await insert_new("expenses", expenses)
+    inserted_inc, skipped_inc = await insert_new("incomes", incomes)
+    await add_to_rollups("expenses", inserted_exp)
+    await add_to_rollups("incomes", inserted_inc)
+
+    return {
+        "inserted_expenses": len(inserted_exp),
+        "inserted_incomes": len(inserted_inc),
+        "skipped_duplicates": skipped_exp + skipped_inc + linked_exp + linked_inc,
+        "skipped_transfers": skipped_transfers,
+        "total_received": len(transactions),
+    }
@@ -0,0 +1,90 @@
+import os
+from datetime import datetime
+from typing import TYPE_CHECKING, List, Optional
+
+from dotenv import load_dotenv
+from loguru import logger
+
+if TYPE_CHECKING:
+    import httpx
+
+load_dotenv()
+
+MONOBANK_API_URL = "https://api.monobank.ua"
+
+
+class MonobankError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(f"Monobank API error {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+class MonobankClient:
+    """Async Monobank personal API client sharing one keep-alive connection pool.
+
+    ``httpx`` is imported on the first request so that cold starts do not pay for it.
+    """
+
+    def __init__(self,
+                 token: Optional[str],
+                 base_url: str = MONOBANK_API_URL,
+                 webhook_endpoint: Optional[str] = None,
+                 timeout: float = 10.0):
+        self.token = token
+        self.base_url = base_url
+        self.webhook_endpoint = webhook_endpoint or f"{base_url}/personal/webhook"
+        self.timeout = timeout
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None or self._client.is_closed:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"X-Token": self.token or ""},
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            )
+        return self._client
+
+    async def _request(self, method: str, url: str, **kwargs) -> "httpx.Response":
+        import httpx
+
+        try:
+            return await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as exc:
+            logger.warning("Monobank request failed: {} {} {!r}", method, url, exc)
+            raise MonobankError(503, repr(exc)) from exc
+
+    async def _get(self, path: str):
+        response = await self._request("GET", path)
+        if response.status_code != 200:
+            logger.warning("Monobank request failed: {} {} {}", path, response.status_code, response.text)
+            raise MonobankError(response.status_code, response.text)
+        return response.json()
+
+    async def get_client_info(self) -> dict:
+        return await self._get("/personal/client-info")
+
+    async def get_statements(self, account: str, date_from: datetime, date_to: datetime) -> List[dict]:
+        return await self._get(
+            f"/personal/statement/{account}/{int(date_from.timestamp())}/{int(date_to.timestamp())}"
+        )
+
+    async def set_webhook(self, webhook_url: str) -> "httpx.Response":
+        return await self._request("POST", self.webhook_endpoint, json={"webHookUrl": webhook_url})
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+mono_api = MonobankClient(
+    os.environ.get("MONO_API_TOKEN"),
+    webhook_endpoint=os.environ.get("URL"),
+    timeout=float(os.environ.get("MONO_API_TIMEOUT", 10)),
+)
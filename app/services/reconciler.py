@@ -0,0 +1,132 @@
+import asyncio
+import datetime
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from loguru import logger
+
+from app.db.mongo_client import ExpenseManagerMongoClient
+from app.services.mono_import import resolve_references
+from app.services.rollups import merge_rollups, rename_in_rollups
+from app.utils.utils import embed_reference, name_key
+
+mongo_client = ExpenseManagerMongoClient()
+
+# Records whose category or source was deleted are moved here
+FALLBACK_NAME = "OTHER"
+
+
+@dataclass(frozen=True)
+class ReferenceField:
+    reference_collection: str
+    collection: str
+    field: str
+
+
+REFERENCE_FIELDS = (
+    ReferenceField("categories", "expenses", "category"),
+    ReferenceField("income_source", "incomes", "source"),
+)
+
+
+class ReferenceReconciler:
+    """Keeps the ``{_id, name}`` copies embedded in expenses and incomes in sync with their source documents.
+
+    A pass runs every ``interval`` seconds and whenever ``trigger`` is called after a rename or delete.
+    """
+
+    def __init__(self, interval: float = 3600):
+        self.interval = interval
+        self.status: dict = {"state": "idle", "runs": 0}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    async def reconcile_field(self, reference: ReferenceField, progress: dict) -> None:
+        documents = await mongo_client.get_many_records(
+            collection=reference.reference_collection,
+            projection={"name": 1},
+        )
+        progress.update(references=len(documents), processed=0, updated=0, orphaned=0)
+
+        # Stale names and legacy full copies of the referenced document
+        for document in documents:
+            id_field = f"{reference.field}._id"
+            result = await mongo_client.update_many(
+                reference.collection,
+                {id_field: document["_id"], "$or": [
+                    {f"{reference.field}.name": {"$ne": document["name"]}},
+                    {f"{reference.field}.name_key": {"$exists": True}},
+                ]},
+                {"$set": {reference.field: embed_reference(document)}},
+            )
+            await rename_in_rollups(reference.collection, document["_id"], document["name"])
+            progress["processed"] += 1
+            progress["updated"] += result.modified_count
+
+        known = {document["_id"] for document in documents}
+        embedded = await mongo_client.distinct(reference.collection, f"{reference.field}._id")
+        orphans = [reference_id for reference_id in embedded if reference_id not in known]
+        if orphans:
+            # References created since ``documents`` was read (e.g. by an import) are not orphans
+            created = await mongo_client.get_many_records(
+                collection=reference.reference_collection,
+                projection={"_id": 1},
+                find_obj={"_id": {"$in": orphans}},
+            )
+            created_ids = {document["_id"] for document in created}
+            orphans = [reference_id for reference_id in orphans if reference_id not in created_ids]
+        if orphans:
+            fallback = (await resolve_references(reference.reference_collection, [FALLBACK_NAME]))[name_key(FALLBACK_NAME)]
+            result = await mongo_client.update_many(
+                reference.collection,
+                {f"{reference.field}._id": {"$in": orphans}},
+                {"$set": {reference.field: embed_reference(fallback)}},
+            )
+            await merge_rollups(reference.collection, orphans, fallback)
+            progress["orphaned"] = result.modified_count
+
+    async def reconcile(self) -> dict:
+        self.status = {
+            "state": "running",
+            "runs": self.status["runs"],
+            "started_at": datetime.datetime.now(),
+            "collections": {},
+        }
+        try:
+            for reference in REFERENCE_FIELDS:
+                progress = self.status["collections"].setdefault(reference.collection, {})
+                await self.reconcile_field(reference, progress)
+            self.status["state"] = "idle"
+            logger.info("References reconciled: {}", self.status["collections"])
+        except Exception as exc:
+            logger.exception("Reference reconciliation failed")
+            self.status.update(state="failed", error=str(exc))
+        self.status["runs"] += 1
+        self.status["finished_at"] = datetime.datetime.now()
+        return self.status
+
+    def trigger(self) -> None:
+        self._wakeup.set()
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.reconcile()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+reference_reconciler = ReferenceReconciler(interval=float(os.environ.get("RECONCILE_INTERVAL", 3600)))
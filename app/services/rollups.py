@@ -0,0 +1,315 @@
+import argparse
+import asyncio
+import datetime
+import math
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from loguru import logger
+from pymongo import DeleteMany, UpdateOne
+
+from app.db.mongo_client import PERIOD_FORMATS, ExpenseManagerMongoClient
+
+mongo_client = ExpenseManagerMongoClient()
+
+ROLLUP_COLLECTION = "monthly_rollups"
+
+# Float sums accumulated with ``$inc`` drift by rounding, smaller differences are not reported
+SUM_TOLERANCE = 1e-6
+
+BucketKey = Tuple[str, ObjectId]
+
+
+@dataclass(frozen=True)
+class RollupSpec:
+    collection: str
+    reference_field: str
+
+
+ROLLUP_SPECS: Dict[str, RollupSpec] = {
+    "expenses": RollupSpec("expenses", "category"),
+    "incomes": RollupSpec("incomes", "source"),
+}
+
+
+def month_of(date: datetime.datetime) -> str:
+    # Mongo stores dates in UTC and groups by UTC month
+    if date.tzinfo is not None:
+        date = date.astimezone(datetime.timezone.utc)
+    return date.strftime(PERIOD_FORMATS["month"])
+
+
+def rollup_id(collection: str, month: str, reference_id: ObjectId) -> str:
+    return f"{collection}|{month}|{reference_id}"
+
+
+def _fold(spec: RollupSpec, documents: Iterable[dict]) -> Dict[BucketKey, dict]:
+    """Group records into (month, reference) buckets holding sum, count, min, max and the reference name"""
+    buckets: Dict[BucketKey, dict] = {}
+    for document in documents:
+        reference = document[spec.reference_field]
+        amount = document["amount"]
+        key = (month_of(document["date"]), reference["_id"])
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = {"sum": amount, "count": 1, "min": amount, "max": amount, "name": reference["name"]}
+        else:
+            bucket["sum"] += amount
+            bucket["count"] += 1
+            bucket["min"] = min(bucket["min"], amount)
+            bucket["max"] = max(bucket["max"], amount)
+    return buckets
+
+
+def rollup_keys(collection: str, documents: Iterable[dict]) -> List[BucketKey]:
+    return list(_fold(ROLLUP_SPECS[collection], documents))
+
+
+def _month_bounds(months: Iterable[str]) -> Tuple[datetime.datetime, datetime.datetime]:
+    starts = [datetime.datetime.strptime(month, PERIOD_FORMATS["month"]) for month in months]
+    last = max(starts)
+    end = last.replace(year=last.year + 1, month=1) if last.month == 12 else last.replace(month=last.month + 1)
+    return min(starts), end
+
+
+def _group_stage(spec: RollupSpec) -> dict:
+    return {
+        "$group": {
+            "_id": {
+                "month": {"$dateToString": {"format": PERIOD_FORMATS["month"], "date": "$date"}},
+                "reference_id": f"${spec.reference_field}._id",
+            },
+            "name": {"$last": f"${spec.reference_field}.name"},
+            "sum": {"$sum": "$amount"},
+            "count": {"$sum": 1},
+            "min": {"$min": "$amount"},
+            "max": {"$max": "$amount"},
+        }
+    }
+
+
+async def _source_stats(spec: RollupSpec, keys: Iterable[BucketKey]) -> Dict[BucketKey, dict]:
+    """Recompute the given buckets from the records collection in one aggregation"""
+    keys = set(keys)
+    if not keys:
+        return {}
+    date_from, date_to = _month_bounds(month for month, _ in keys)
+    rows = await mongo_client.aggregate(spec.collection, [
+        {"$match": {
+            f"{spec.reference_field}._id": {"$in": list({reference_id for _, reference_id in keys})},
+            "date": {"$gte": date_from, "$lt": date_to},
+        }},
+        _group_stage(spec),
+    ])
+    stats = {(row["_id"]["month"], row["_id"]["reference_id"]): row for row in rows}
+    return {key: row for key, row in stats.items() if key in keys}
+
+
+async def add_to_rollups(collection: str, documents: List[dict]) -> None:
+    """Fold newly stored records into their buckets, one ``bulk_write`` per call.
+
+    The records are already stored at this point, so a failure is logged instead of raised;
+    ``python -m app.services.rollups --rebuild`` repairs the resulting drift.
+    """
+    spec = ROLLUP_SPECS[collection]
+    requests = [
+        UpdateOne(
+            {"_id": rollup_id(collection, month, reference_id)},
+            {
+                "$inc": {"sum": bucket["sum"], "count": bucket["count"]},
+                "$min": {"min": bucket["min"]},
+                "$max": {"max": bucket["max"]},
+                "$set": {"name": bucket["name"]},
+                "$setOnInsert": {"collection": collection, "month": month, "reference_id": reference_id},
+            },
+            upsert=True,
+        )
+        for (month, reference_id), bucket in _fold(spec, documents).items()
+    ]
+    if not requests:
+        return
+    try:
+        await mongo_client.bulk_write(ROLLUP_COLLECTION, requests, ordered=False)
+    except Exception:
+        logger.exception("Failed to add {} {} to rollups", len(documents), collection)
+
+
+async def remove_from_rollups(collection: str, documents: List[dict]) -> None:
+    """Subtract deleted records from their buckets, failures are logged like in ``add_to_rollups``.
+
+    Sums and counts are decremented with ``$inc``; a minimum or maximum cannot be undone that way,
+    so they are re-read for the touched buckets, and emptied buckets are dropped.
+    """
+    spec = ROLLUP_SPECS[collection]
+    buckets = _fold(spec, documents)
+    if not buckets:
+        return
+
+    requests = [
+        UpdateOne(
+            {"_id": rollup_id(collection, month, reference_id)},
+            {"$inc": {"sum": -bucket["sum"], "count": -bucket["count"]}},
+        )
+        for (month, reference_id), bucket in buckets.items()
+    ]
+    try:
+        await mongo_client.bulk_write(ROLLUP_COLLECTION, requests, ordered=False)
+        await refresh_rollups(collection, buckets, extremes_only=True)
+    except Exception:
+        logger.exception("Failed to remove {} {} from rollups", len(documents), collection)
+
+
+async def refresh_rollups(collection: str, keys: Iterable[BucketKey], extremes_only: bool = False) -> None:
+    """Overwrite the given buckets with freshly computed values, dropping the ones left without records"""
+    spec = ROLLUP_SPECS[collection]
+    keys = list(keys)
+    stats = await _source_stats(spec, keys)
+    requests = []
+    for (month, reference_id), row in stats.items():
+        _id = rollup_id(collection, month, reference_id)
+        if extremes_only:
+            requests.append(UpdateOne({"_id": _id}, {"$set": {"min": row["min"], "max": row["max"]}}))
+            continue
+        requests.append(UpdateOne(
+            {"_id": _id},
+            {"$set": {
+                "collection": collection,
+                "month": month,
+                "reference_id": reference_id,
+                "name": row["name"],
+                "sum": row["sum"],
+                "count": row["count"],
+                "min": row["min"],
+                "max": row["max"],
+            }},
+            upsert=True,
+        ))
+    empty = [rollup_id(collection, *key) for key in keys if key not in stats]
+    if empty:
+        requests.append(DeleteMany({"_id": {"$in": empty}}))
+    if requests:
+        await mongo_client.bulk_write(ROLLUP_COLLECTION, requests, ordered=False)
+
+
+async def rename_in_rollups(collection: str, reference_id: ObjectId, name: str) -> None:
+    await mongo_client.update_many(
+        ROLLUP_COLLECTION,
+        {"collection": collection, "reference_id": reference_id, "name": {"$ne": name}},
+        {"$set": {"name": name}},
+    )
+
+
+async def merge_rollups(collection: str, reference_ids: List[ObjectId], target: dict) -> None:
+    """Move the buckets of deleted references onto ``target`` after their records were reassigned"""
+    rows = await mongo_client.get_many_records(
+        collection=ROLLUP_COLLECTION,
+        find_obj={"collection": collection, "reference_id": {"$in": reference_ids}},
+    )
+    if not rows:
+        return
+    requests = [
+        UpdateOne(
+            {"_id": rollup_id(collection, row["month"], target["_id"])},
+            {
+                "$inc": {"sum": row["sum"], "count": row["count"]},
+                "$min": {"min": row["min"]},
+                "$max": {"max": row["max"]},
+                "$set": {"name": target["name"]},
+                "$setOnInsert": {"collection": collection, "month": row["month"], "reference_id": target["_id"]},
+            },
+            upsert=True,
+        )
+        for row in rows
+    ]
+    requests.append(DeleteMany({"_id": {"$in": [row["_id"] for row in rows]}}))
+    await mongo_client.bulk_write(ROLLUP_COLLECTION, requests, ordered=True)
+
+
+async def get_rollups(collection: str, month_from: Optional[str] = None, month_to: Optional[str] = None) -> List[dict]:
+    """Read stored buckets for ``[month_from, month_to]``, months formatted as ``YYYY-MM``"""
+    find_obj: dict = {"collection": collection}
+    month_range = {}
+    if month_from is not None:
+        month_range["$gte"] = month_from
+    if month_to is not None:
+        month_range["$lte"] = month_to
+    if month_range:
+        find_obj["month"] = month_range
+    return await mongo_client.get_many_records(
+        collection=ROLLUP_COLLECTION,
+        projection={"_id": 0, "month": 1, "name": 1, "sum": 1, "count": 1, "min": 1, "max": 1},
+        find_obj=find_obj,
+        sort=[("month", 1), ("name", 1)],
+        read_only=True,
+    )
+
+
+def _differs(stored: dict, expected: dict) -> bool:
+    if stored["count"] != expected["count"] or stored["name"] != expected["name"]:
+        return True
+    if stored["min"] != expected["min"] or stored["max"] != expected["max"]:
+        return True
+    return not math.isclose(stored["sum"], expected["sum"], rel_tol=SUM_TOLERANCE, abs_tol=SUM_TOLERANCE)
+
+
+async def verify_rollups(collection: str, rebuild: bool = False) -> dict:
+    """Recompute every bucket from scratch and report drift, optionally replacing the stored buckets"""
+    spec = ROLLUP_SPECS[collection]
+    expected = {
+        rollup_id(collection, row["_id"]["month"], row["_id"]["reference_id"]): {
+            "collection": collection,
+            "month": row["_id"]["month"],
+            "reference_id": row["_id"]["reference_id"],
+            "name": row["name"],
+            "sum": row["sum"],
+            "count": row["count"],
+            "min": row["min"],
+            "max": row["max"],
+        }
+        for row in await mongo_client.aggregate(spec.collection, [_group_stage(spec)])
+    }
+    stored = {
+        row["_id"]: row
+        for row in await mongo_client.get_many_records(
+            collection=ROLLUP_COLLECTION,
+            find_obj={"collection": collection},
+        )
+    }
+
+    report = {
+        "buckets": len(expected),
+        "missing": sorted(expected.keys() - stored.keys()),
+        "extra": sorted(stored.keys() - expected.keys()),
+        "drifted": sorted(
+            _id for _id in expected.keys() & stored.keys() if _differs(stored[_id], expected[_id])
+        ),
+    }
+
+    if rebuild:
+        requests = [UpdateOne({"_id": _id}, {"$set": row}, upsert=True) for _id, row in expected.items()]
+        if report["extra"]:
+            requests.append(DeleteMany({"_id": {"$in": report["extra"]}}))
+        if requests:
+            await mongo_client.bulk_write(ROLLUP_COLLECTION, requests, ordered=False)
+        logger.info("Rollups rebuilt for {}: {} buckets", collection, len(expected))
+    return report
+
+
+async def _main(rebuild: bool) -> None:
+    for collection in ROLLUP_SPECS:
+        report = await verify_rollups(collection, rebuild=rebuild)
+        logger.info(
+            "{}: {} buckets, missing={}, extra={}, drifted={}",
+            collection,
+            report["buckets"],
+            report["missing"],
+            report["extra"],
+            report["drifted"],
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify or rebuild the monthly rollups")
+    parser.add_argument("--rebuild", action="store_true", help="replace stored buckets with recomputed ones")
+    asyncio.run(_main(parser.parse_args().rebuild))
@@ -0,0 +1,199 @@
+import asyncio
+import datetime
+import os
+import uuid
+from typing import List, Optional
+
+from loguru import logger
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from app.db.mongo_client import ExpenseManagerMongoClient
+from app.services.mono_import import import_statement
+
+mongo_client = ExpenseManagerMongoClient()
+
+QUEUE_COLLECTION = "webhook_queue"
+
+
+class WebhookQueue:
+    """Mongo-backed queue of webhook statement items drained by a pool of asyncio workers.
+
+    Items are keyed by the Monobank statement id, so a redelivered webhook is not enqueued twice.
+    """
+
+    def __init__(self,
+                 workers: int = 2,
+                 batch_size: int = 50,
+                 max_attempts: int = 5,
+                 poll_interval: float = 1.0,
+                 lock_timeout: float = 60.0):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.lock_timeout = lock_timeout
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+        self.last_batch_lag: Optional[float] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    async def enqueue(self, account: str, item: dict) -> bool:
+        """Store the item for processing, returns False when it was already enqueued"""
+        now = datetime.datetime.now()
+        try:
+            await mongo_client.insert_one(QUEUE_COLLECTION, {
+                "_id": item["id"],
+                "account": account,
+                "item": item,
+                "status": "pending",
+                "attempts": 0,
+                "enqueued_at": now,
+                "available_at": now,
+            })
+        except DuplicateKeyError:
+            logger.info("Statement item {} is already queued", item["id"])
+            return False
+        self._wakeup.set()
+        return True
+
+    async def claim(self) -> List[dict]:
+        """Atomically take up to ``batch_size`` due items, including ones left locked by a dead worker"""
+        now = datetime.datetime.now()
+        due = {"$or": [
+            {"status": "pending", "available_at": {"$lte": now}},
+            {"status": "processing", "locked_until": {"$lt": now}},
+        ]}
+        candidates = await mongo_client.get_many_records(
+            collection=QUEUE_COLLECTION,
+            projection={"_id": 1},
+            find_obj=due,
+            sort=[("available_at", ASCENDING)],
+            limit=self.batch_size,
+        )
+        if not candidates:
+            return []
+
+        token = uuid.uuid4().hex
+        await mongo_client.update_many(
+            QUEUE_COLLECTION,
+            {"$and": [{"_id": {"$in": [candidate["_id"] for candidate in candidates]}}, due]},
+            {"$set": {
+                "status": "processing",
+                "claim": token,
+                "locked_until": now + datetime.timedelta(seconds=self.lock_timeout),
+            }},
+        )
+        return await mongo_client.get_many_records(collection=QUEUE_COLLECTION, find_obj={"claim": token})
+
+    async def process(self, entries: List[dict]) -> None:
+        # Internal transfers are classified and skipped by ``import_statement``
+        transactions = [entry["item"] for entry in entries]
+        ids = [entry["_id"] for entry in entries]
+
+        try:
+            result = await import_statement(transactions)
+        except Exception:
+            if len(entries) > 1:
+                # Halve the batch until the failing items are isolated, the rest is stored as usual.
+                # Items stored before the failure are skipped by the unique ``mono_id`` index on the rerun.
+                logger.warning("Failed to process webhook batch {}, splitting it", ids)
+                middle = len(entries) // 2
+                await self.process(entries[:middle])
+                await self.process(entries[middle:])
+                return
+            logger.exception("Failed to process webhook item {}", ids)
+            await self._retry(entries)
+            return
+
+        now = datetime.datetime.now()
+        await mongo_client.update_many(
+            QUEUE_COLLECTION,
+            {"_id": {"$in": ids}},
+            {"$set": {"status": "done", "processed_at": now}, "$unset": {"claim": "", "locked_until": ""}},
+        )
+        self.processed += len(entries)
+        self.last_batch_lag = max((now - entry["enqueued_at"]).total_seconds() for entry in entries)
+        logger.info("Processed {} webhook items: {}", len(entries), result)
+
+    async def _retry(self, entries: List[dict]) -> None:
+        now = datetime.datetime.now()
+        for entry in entries:
+            attempts = entry["attempts"] + 1
+            if attempts >= self.max_attempts:
+                update = {"status": "failed", "attempts": attempts}
+                self.failed += 1
+            else:
+                backoff = datetime.timedelta(seconds=self.poll_interval * 2 ** attempts)
+                update = {"status": "pending", "attempts": attempts, "available_at": now + backoff}
+                self.retried += 1
+            await mongo_client.update_one(
+                QUEUE_COLLECTION,
+                {"_id": entry["_id"]},
+                {"$set": update, "$unset": {"claim": "", "locked_until": ""}},
+            )
+
+    async def _worker(self, number: int) -> None:
+        logger.info("Webhook worker {} started", number)
+        while True:
+            try:
+                entries = await self.claim()
+                if entries:
+                    await self.process(entries)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Webhook worker {} failed to drain the queue", number)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker(number)) for number in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def metrics(self) -> dict:
+        depth = {
+            entry["_id"]: entry["count"]
+            for entry in await mongo_client.aggregate(
+                QUEUE_COLLECTION,
+                [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+            )
+        }
+        oldest = await mongo_client.get_one_record(
+            QUEUE_COLLECTION,
+            {"status": "pending"},
+            sort=[("enqueued_at", ASCENDING)],
+        )
+        return {
+            "depth": depth,
+            "oldest_pending_seconds": (
+                (datetime.datetime.now() - oldest["enqueued_at"]).total_seconds() if oldest else None
+            ),
+            "last_batch_lag_seconds": self.last_batch_lag,
+            "processed": self.processed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "workers": len(self._tasks),
+        }
+
+
+webhook_queue = WebhookQueue(
+    workers=int(os.environ.get("WEBHOOK_WORKERS", 2)),
+    batch_size=int(os.environ.get("WEBHOOK_BATCH_SIZE", 50)),
+    max_attempts=int(os.environ.get("WEBHOOK_MAX_ATTEMPTS", 5)),
+    poll_interval=float(os.environ.get("WEBHOOK_POLL_INTERVAL", 1.0)),
+)
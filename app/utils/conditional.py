@@ -0,0 +1,34 @@
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response, status
+
+from app.db.mongo_client import ExpenseManagerMongoClient
+
+ETAG_HEADER = "ETag"
+# Browsers may keep the copy but have to revalidate it with ``If-None-Match`` on every use
+LIST_CACHE_CONTROL = "private, no-cache"
+
+mongo_client = ExpenseManagerMongoClient()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of ``etag`` against an ``If-None-Match`` header value"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in tags)
+
+
+async def check_not_modified(request: Request, *collections: str) -> Tuple[Optional[Response], Dict[str, str]]:
+    """Validate the client copy of a listing built from ``collections`` against their write versions.
+
+    Returns a ``304`` response when the copy is current, otherwise None, together with the caching
+    headers for the full response. The listing is keyed by URL, so query parameters need no part
+    in the tag.
+    """
+    versions = await mongo_client.get_versions(collections)
+    etag = f'W/"{"-".join(versions[collection] for collection in collections)}"'
+    headers = {ETAG_HEADER: etag, "Cache-Control": LIST_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers), headers
+    return None, headers
@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Optional
+
+from app.utils.utils import to_naive_local
+
+
+def range_filter(date_from: Optional[datetime] = None,
+                 date_to: Optional[datetime] = None,
+                 min_amount: Optional[float] = None,
+                 max_amount: Optional[float] = None) -> dict:
+    """Build a Mongo filter for ``[date_from, date_to)`` and ``[min_amount, max_amount]``
+
+    Aware dates are converted to naive local time, the form dates are stored in.
+    Raises ValueError when a range is empty.
+    """
+    date_from, date_to = to_naive_local(date_from), to_naive_local(date_to)
+    if date_from is not None and date_to is not None and date_from >= date_to:
+        raise ValueError("'from' must be earlier than 'to'")
+    if min_amount is not None and max_amount is not None and min_amount > max_amount:
+        raise ValueError("'min_amount' must not exceed 'max_amount'")
+
+    find_obj = {}
+    date_range = {}
+    if date_from is not None:
+        date_range["$gte"] = date_from
+    if date_to is not None:
+        date_range["$lt"] = date_to
+    if date_range:
+        find_obj["date"] = date_range
+
+    amount_range = {}
+    if min_amount is not None:
+        amount_range["$gte"] = min_amount
+    if max_amount is not None:
+        amount_range["$lte"] = max_amount
+    if amount_range:
+        find_obj["amount"] = amount_range
+
+    return find_obj
@@ -0,0 +1,77 @@
+import os
+import random
+import sys
+from typing import Any, Dict
+
+from loguru import logger
+
+# Longest repr of a query or document written to the log
+PAYLOAD_LIMIT = int(os.environ.get("LOG_PAYLOAD_LIMIT", 200))
+
+
+def _parse_mapping(raw: str) -> Dict[str, str]:
+    """Parse ``"a=1,b=2"`` into ``{"a": "1", "b": "2"}``"""
+    pairs = (item.split("=", 1) for item in raw.split(",") if "=" in item)
+    return {key.strip(): value.strip() for key, value in pairs}
+
+
+# Fraction of calls logged per Mongo operation, e.g. MONGO_LOG_SAMPLING="get_one_record=0.01"
+SAMPLE_RATES = {
+    operation: float(rate)
+    for operation, rate in _parse_mapping(os.environ.get("MONGO_LOG_SAMPLING", "")).items()
+}
+DEFAULT_SAMPLE_RATE = float(os.environ.get("MONGO_LOG_SAMPLE_RATE", 1.0))
+
+
+def configure_logging() -> None:
+    """Replace the default sink with an enqueued one honouring LOG_LEVEL and per-module LOG_LEVELS.
+
+    LOG_LEVELS="app.db=WARNING,app.routes.mono_client=DEBUG" sets levels by module prefix,
+    LOG_JSON=1 switches to one JSON object per line.
+    """
+    levels = {"": os.environ.get("LOG_LEVEL", "INFO").upper()}
+    levels.update({module: level.upper() for module, level in _parse_mapping(os.environ.get("LOG_LEVELS", "")).items()})
+
+    logger.remove()
+    logger.add(
+        sys.stderr,
+        level=min(levels.values(), key=lambda name: logger.level(name).no),
+        filter=levels,
+        enqueue=True,
+        serialize=os.environ.get("LOG_JSON") == "1",
+    )
+
+
+def truncate(value: Any, limit: int = PAYLOAD_LIMIT) -> str:
+    text = repr(value)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... ({len(text)} chars)"
+
+
+def _sampled(operation: str) -> bool:
+    rate = SAMPLE_RATES.get(operation, DEFAULT_SAMPLE_RATE)
+    return rate >= 1 or random.random() < rate
+
+
+def log_call(operation: str, collection: str, **arguments: Any) -> None:
+    """Debug-log a database call, arguments are only formatted when the record is emitted"""
+    if not _sampled(operation):
+        return
+    logger.opt(lazy=True, depth=1).debug(
+        "-->> {operation} {collection} {arguments}",
+        operation=lambda: operation,
+        collection=lambda: collection,
+        arguments=lambda: ", ".join(f"{name}={truncate(value)}" for name, value in arguments.items()),
+    )
+
+
+def log_result(operation: str, collection: str, result: Any) -> None:
+    if not _sampled(operation):
+        return
+    logger.opt(lazy=True, depth=1).debug(
+        "<<-- {operation} {collection} {result}",
+        operation=lambda: operation,
+        collection=lambda: collection,
+        result=lambda: truncate(result),
+    )
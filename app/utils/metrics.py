@@ -0,0 +1,113 @@
+import functools
+import inspect
+import time
+from typing import Callable
+
+from prometheus_client import Counter, Gauge, Histogram
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling HTTP requests",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_OPERATION_LATENCY = Histogram(
+    "mongo_operation_duration_seconds",
+    "Time spent in ExpenseManagerMongoClient methods",
+    ["collection", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_COMMAND_LATENCY = Histogram(
+    "mongo_command_duration_seconds",
+    "Server round trip time of MongoDB commands",
+    ["command", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+POOL_CHECKED_OUT = Gauge("mongo_pool_checked_out_connections", "Connections currently checked out of the pool")
+POOL_CHECKOUT_WAIT = Histogram(
+    "mongo_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    buckets=LATENCY_BUCKETS,
+)
+POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total",
+    "Connection check outs that failed, e.g. on wait queue timeout",
+    ["reason"],
+)
+
+
+def timed(operation: str) -> Callable:
+    """Record the latency of a client method labelled by its ``collection`` argument and ``operation``"""
+    def decorator(func):
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def generator_wrapper(self, collection, *args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    async for item in func(self, collection, *args, **kwargs):
+                        yield item
+                finally:
+                    DB_OPERATION_LATENCY.labels(collection, operation).observe(time.perf_counter() - started)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        async def wrapper(self, collection, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(self, collection, *args, **kwargs)
+            finally:
+                DB_OPERATION_LATENCY.labels(collection, operation).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+class CommandLatencyListener(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        DB_COMMAND_LATENCY.labels(event.command_name, "succeeded").observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        DB_COMMAND_LATENCY.labels(event.command_name, "failed").observe(event.duration_micros / 1e6)
+
+
+class PoolListener(monitoring.ConnectionPoolListener):
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        POOL_CHECKOUT_FAILURES.labels(str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        POOL_CHECKED_OUT.inc()
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            POOL_CHECKOUT_WAIT.observe(duration)
+
+    def connection_checked_in(self, event):
+        POOL_CHECKED_OUT.dec()
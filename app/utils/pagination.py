@@ -0,0 +1,88 @@
+import base64
+import binascii
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING
+
+from app.utils.serialization import Projector, dumps
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+Sort = List[Tuple[str, int]]
+
+# Newest first; ``_id`` breaks ties between records sharing the same ``date``.
+PAGE_SORT: Sort = [("date", DESCENDING), ("_id", DESCENDING)]
+
+
+class SortOrder(str, Enum):
+    date_desc = "date_desc"
+    date_asc = "date_asc"
+    amount_desc = "amount_desc"
+    amount_asc = "amount_asc"
+
+    @property
+    def field(self) -> str:
+        return self.value.rsplit("_", 1)[0]
+
+    @property
+    def spec(self) -> Sort:
+        direction = DESCENDING if self.value.endswith("_desc") else ASCENDING
+        return [(self.field, direction), ("_id", direction)]
+
+
+def encode_cursor(document: dict, sort: Sort = PAGE_SORT) -> str:
+    """Build an opaque cursor pointing right after ``document`` in ``sort`` order"""
+    value = document[sort[0][0]]
+    value = value.isoformat() if isinstance(value, datetime) else repr(value)
+    raw = f"{value}|{document['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str, sort: Sort = PAGE_SORT) -> Tuple[object, ObjectId]:
+    """Parse a cursor produced by ``encode_cursor``, raises ValueError when it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        value, _id = raw.split("|", 1)
+        value = datetime.fromisoformat(value) if sort[0][0] == "date" else float(value)
+        return value, ObjectId(_id)
+    except (binascii.Error, UnicodeDecodeError, InvalidId, TypeError, ValueError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor}") from exc
+
+
+def keyset_filter(cursor: Optional[str], find_obj: Optional[dict] = None, sort: Sort = PAGE_SORT) -> dict:
+    """Combine ``find_obj`` with a range condition selecting records after ``cursor``"""
+    find_obj = find_obj or {}
+    if cursor is None:
+        return find_obj
+
+    field, direction = sort[0]
+    value, _id = decode_cursor(cursor, sort)
+    operator = "$lt" if direction == DESCENDING else "$gt"
+    after_cursor = {
+        "$or": [
+            {field: {operator: value}},
+            {field: value, "_id": {operator: _id}},
+        ]
+    }
+    return {"$and": [find_obj, after_cursor]} if find_obj else after_cursor
+
+
+def split_page(documents: list, limit: int, sort: Sort = PAGE_SORT) -> Tuple[list, Optional[str]]:
+    """Trim a ``limit + 1`` sized batch to ``limit`` and return the cursor of the next page"""
+    if len(documents) <= limit:
+        return documents, None
+    page = documents[:limit]
+    return page, encode_cursor(page[-1], sort)
+
+
+async def ndjson_lines(records: AsyncIterator[dict], projector: Projector) -> AsyncIterator[bytes]:
+    """Serialize records one by one into newline-delimited JSON"""
+    async for record in records:
+        yield dumps(projector(record)) + b"\n"
@@ -0,0 +1,123 @@
+from functools import lru_cache
+from typing import Any, Callable, FrozenSet, Iterable, List, Optional, Tuple, Type, Union, get_args, get_origin
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel, Field, create_model
+
+Projector = Callable[[dict], dict]
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+@lru_cache(maxsize=None)
+def compile_projector(model: Type[BaseModel], fields: Optional[FrozenSet[str]] = None) -> Projector:
+    """Build a function shaping a Mongo document like ``model`` would serialize it, without validation.
+
+    ``_id`` values become strings, nested models are projected recursively and floats are coerced,
+    everything else is passed through for orjson to encode. ``fields`` restricts the output to the
+    given keys, dotted paths such as ``category.name`` select part of a nested model.
+    """
+    steps = []
+    for name, field in model.model_fields.items():
+        key = field.alias or name
+        nested_fields = None
+        if fields is not None and key not in fields:
+            nested_fields = frozenset(path[len(key) + 1:] for path in fields if path.startswith(f"{key}."))
+            if not nested_fields:
+                continue
+
+        annotation = _unwrap_optional(field.annotation)
+        convert: Optional[Callable[[Any], Any]] = None
+        if key == "_id":
+            convert = str
+        elif isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            convert = compile_projector(annotation, nested_fields)
+        elif annotation is float:
+            convert = float
+        steps.append((key, convert))
+
+    def project(document: dict) -> dict:
+        result = {}
+        for key, convert in steps:
+            value = document.get(key)
+            result[key] = convert(value) if convert is not None and value is not None else value
+        return result
+
+    return project
+
+
+@lru_cache(maxsize=None)
+def partial_model(model: Type[BaseModel]) -> Type[BaseModel]:
+    """Copy of ``model`` with every field optional, nested models included, describing ``fields=`` output"""
+    definitions = {}
+    for name, field in model.model_fields.items():
+        annotation = _unwrap_optional(field.annotation)
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            annotation = partial_model(annotation)
+        definitions[name] = (Optional[annotation], Field(default=None, alias=field.alias))
+    return create_model(f"{model.__name__}Fields", **definitions)
+
+
+def list_response_model(model: Type[BaseModel]) -> Any:
+    """Response model of a listing: full ``model`` documents, or partial ones when ``fields=`` is given"""
+    return Union[List[model], List[partial_model(model)]]
+
+
+def field_paths(model: Type[BaseModel], prefix: str = "") -> List[str]:
+    """Every key of ``model`` that can be selected, including dotted paths into nested models"""
+    paths = []
+    for name, field in model.model_fields.items():
+        path = f"{prefix}{field.alias or name}"
+        paths.append(path)
+        annotation = _unwrap_optional(field.annotation)
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            paths.extend(field_paths(annotation, f"{path}."))
+    return paths
+
+
+def select_fields(model: Type[BaseModel],
+                  fields: Optional[str],
+                  required: Tuple[str, ...] = ()) -> Tuple[Optional[dict], Projector]:
+    """Turn a ``fields=a,b.c`` query parameter into a Mongo projection and a matching projector.
+
+    ``required`` keys are fetched from Mongo (e.g. for building cursors) but not returned unless
+    requested. Raises ValueError on unknown field names.
+    """
+    if not fields:
+        return None, compile_projector(model)
+
+    selected = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = selected - set(field_paths(model))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    # A parent and its own sub-path would collide in a Mongo projection
+    selected = {field for field in selected if field.split(".")[0] == field or field.split(".")[0] not in selected}
+    selected.add("_id")
+    projection = {field: 1 for field in selected | set(required)}
+    return projection, compile_projector(model, frozenset(selected))
+
+
+def _default(value: Any) -> Any:
+    # ObjectId and other BSON scalars left in pass-through fields
+    return str(value)
+
+
+def dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=_default)
+
+
+def json_list_response(documents: Iterable[dict], projector: Projector, **kwargs) -> Response:
+    """JSON array response of already fetched documents, encoded in one orjson call"""
+    return Response(
+        content=dumps([projector(document) for document in documents]),
+        media_type="application/json",
+        **kwargs,
+    )
@@ -1,50 +1,19 @@
-MCC_CATEGORIES = {
-    # Grocery & supermarkets
-    5411: "groceries",
-    5422: "meat",
-    5441: "candy",
-    5451: "dairy",
-    5462: "bakery",
+from datetime import datetime
+from typing import Optional
 
-    # Restaurants
-    5812: "restaurants",
-    5813: "bars",
-    5814: "fast_food",
 
-    # Shopping
-    5311: "department_store",
-    5651: "clothing",
-    5999: "shopping_other",
+def name_key(name: str) -> str:
+    """Normalized form of a category or income source name used for lookups"""
+    return " ".join(name.split()).casefold()
 
-    # Pharmacy
-    5912: "pharmacy",
 
-    # Transport
-    4111: "transport",
-    4121: "taxi",
+def embed_reference(document: dict) -> dict:
+    """Part of a category or income source document embedded into expenses and incomes"""
+    return {"_id": document["_id"], "name": document["name"]}
 
-    # Services / subscriptions
-    4899: "subscription",
-    4814: "telecom",
-
-    # Transfers
-    4829: "transfers",
-
-    # Sport / health
-    7941: "fitness",
-
-    # Default
-    0: "other"
-}
-
-internal_transfer = [
-    'Часткове зняття банки',
-    'Округлення балансу',
-    'Поповнення',
-    'Переказ на картку',
-    'Trip'
-]
-
-def get_category_from_mcc(mcc: int):
-    return MCC_CATEGORIES.get(mcc, "other").upper()
 
+def to_naive_local(value: Optional[datetime]) -> Optional[datetime]:
+    """Naive local time of an aware datetime, the form dates are stored in (``datetime.fromtimestamp``)"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
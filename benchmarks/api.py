@@ -0,0 +1,351 @@
+"""Latency, throughput and peak RSS of the main API routes against a seeded MongoDB.
+
+    python benchmarks/api.py [--scales 10000 100000 1000000] [--requests 200] [--concurrency 8]
+                             [--output api.json] [--baseline baseline.json] [--threshold 0.2]
+    python benchmarks/api.py --results api.json --baseline baseline.json
+
+The app is driven in-process through an ASGI client with its lifespan running, so indexes,
+the webhook queue and the reconciler behave as in production; the Monobank client is stubbed.
+Data goes to BENCHMARK_DB_NAME on MONGO_HOST, which is dropped and reseeded for every scale.
+A local single-node ``mongod`` is enough, e.g. ``docker run -p 27017:27017 mongo:7``.
+
+Percentiles cover successful requests only. The script exits with status 1 when any request
+failed, and with ``--baseline`` also when a scenario fails more often than in the stored result
+file or a latency percentile or the throughput regresses beyond the threshold.
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+DB_NAME = os.environ.get("BENCHMARK_DB_NAME", "expense_manager_benchmark")
+if "benchmark" not in DB_NAME:
+    sys.exit(f"Refusing to drop {DB_NAME!r}: BENCHMARK_DB_NAME must contain 'benchmark'")
+os.environ["DB_NAME"] = DB_NAME
+# Per-request INFO lines would dominate the measured latency
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx  # noqa: E402
+from bson import ObjectId  # noqa: E402
+
+import main  # noqa: E402
+from app.db.mongo_client import ExpenseManagerMongoClient  # noqa: E402
+from app.services.backfill import statement_limiter  # noqa: E402
+from app.services.monobank_api import mono_api  # noqa: E402
+from app.services.rollups import ROLLUP_SPECS, verify_rollups  # noqa: E402
+from app.utils.utils import name_key  # noqa: E402
+
+CATEGORIES = [
+    "GROCERIES", "RESTAURANTS", "TRANSPORT", "FUEL", "PHARMACY", "CLOTHES", "ELECTRONICS",
+    "ENTERTAINMENT", "TRAVEL", "UTILITIES", "EDUCATION", "SPORT", "BEAUTY", "HOME", "OTHER",
+]
+SOURCES = ["Salary", "Present", "Freelance", "Cashback"]
+SEED_BATCH = 10_000
+SEED_START = datetime.datetime(2023, 1, 1)
+SEED_SPAN = datetime.timedelta(days=2 * 365)
+ACCOUNT = "benchmark-account"
+
+# (metric, True when a larger value is worse)
+COMPARED_METRICS = [("p50_ms", True), ("p95_ms", True), ("p99_ms", True), ("throughput_rps", False)]
+
+_ids = itertools.count()
+
+
+def unique_id(prefix: str) -> str:
+    return f"{prefix}-{os.getpid()}-{next(_ids)}"
+
+
+def make_transaction(negative: bool = True) -> dict:
+    amount = random.randint(100, 500_000)
+    return {
+        "id": unique_id("tx"),
+        "time": int(time.time()) - random.randint(0, 86_400),
+        "amount": -amount if negative else amount,
+        "description": random.choice(["Silpo", "Uber", "WOG", "Rozetka", "Netflix"]),
+        "mcc": random.choice([5411, 4121, 5541, 5732, 4899]),
+    }
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    method: str
+    path: str
+    params: Optional[dict] = None
+    # Builds the JSON body of each call, bodies carry fresh ids so inserts are never duplicates
+    body: Optional[Callable[[], Any]] = None
+    # Caps the number of calls for scenarios returning whole collections
+    max_requests: Optional[int] = None
+    # Largest scale the scenario runs at
+    max_scale: Optional[int] = None
+
+
+SCENARIOS = [
+    Scenario("expenses_all_page", "GET", "/expenses/all", params={"limit": 100}),
+    Scenario("expenses_all", "GET", "/expenses/all", max_requests=20, max_scale=100_000),
+    Scenario("expenses_by_category", "GET", "/expenses/category/GROCERIES", max_requests=50),
+    Scenario("expenses_by_category_month", "GET", "/expenses/category/GROCERIES",
+             params={"from": "2024-06-01T00:00:00", "to": "2024-07-01T00:00:00"}),
+    Scenario("expenses_add", "POST", "/expenses/add", body=lambda: {
+        "date": datetime.datetime.now().isoformat(),
+        "amount": round(random.uniform(1, 5000), 2),
+        "comment": "benchmark",
+        "category_name": random.choice(CATEGORIES),
+    }),
+    Scenario("mono_webhook", "POST", "/expenses_mono/webhook", body=lambda: {
+        "type": "StatementItem",
+        "data": {"account": ACCOUNT, "statementItem": make_transaction()},
+    }),
+    # Only starts the import job, the stubbed statement is stored in the background
+    Scenario("mono_import", "POST", "/expenses_mono/import"),
+]
+
+
+@dataclass
+class Stats:
+    # Successful requests only, a fast failing endpoint must not look like a faster one
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    error_statuses: Dict[int, int] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    def summary(self) -> dict:
+        latencies = sorted(self.latencies)
+
+        def percentile(q: float) -> Optional[float]:
+            if not latencies:
+                return None
+            # Nearest rank
+            return round(latencies[max(0, min(len(latencies) - 1, round(q * len(latencies)) - 1))] * 1000, 3)
+
+        return {
+            "requests": len(latencies) + self.errors,
+            "errors": self.errors,
+            "error_statuses": {str(code): count for code, count in sorted(self.error_statuses.items())},
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": percentile(1.0),
+            "throughput_rps": round(len(latencies) / self.elapsed, 2),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """High-water mark of the whole process, it only grows between scenarios"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def stub_monobank(statement_size: int) -> None:
+    async def get_client_info() -> dict:
+        return {"accounts": [{"id": ACCOUNT}]}
+
+    async def get_statements(account: str, date_from: datetime.datetime, date_to: datetime.datetime) -> List[dict]:
+        return [make_transaction(negative=index % 5 != 0) for index in range(statement_size)]
+
+    mono_api.get_client_info = get_client_info
+    mono_api.get_statements = get_statements
+    # The stub has no rate limit to respect
+    statement_limiter.interval = 0
+
+
+async def seed(mongo_client: ExpenseManagerMongoClient, scale: int) -> None:
+    for collection in ("expenses", "incomes", "categories", "income_source", "webhook_queue", "monthly_rollups",
+                       "backfill_jobs"):
+        await mongo_client.db[collection].delete_many({})
+
+    references = {}
+    for collection, names in (("categories", CATEGORIES), ("income_source", SOURCES)):
+        documents = [{"_id": ObjectId(), "name": name, "name_key": name_key(name)} for name in names]
+        await mongo_client.insert_many(collection, documents)
+        references[collection] = [{"_id": document["_id"], "name": document["name"]} for document in documents]
+
+    step = SEED_SPAN / scale
+    for start in range(0, scale, SEED_BATCH):
+        await mongo_client.insert_many("expenses", [
+            {
+                "date": SEED_START + step * index,
+                "amount": round(random.uniform(1, 5000), 2),
+                "comment": f"Purchase #{index}",
+                "category": random.choice(references["categories"]),
+                **({"mono_id": f"seed-{index}"} if index % 2 else {}),
+            }
+            for index in range(start, min(start + SEED_BATCH, scale))
+        ], ordered=False)
+
+    incomes = max(1, scale // 10)
+    step = SEED_SPAN / incomes
+    for start in range(0, incomes, SEED_BATCH):
+        await mongo_client.insert_many("incomes", [
+            {
+                "date": SEED_START + step * index,
+                "amount": round(random.uniform(100, 50_000), 2),
+                "source": random.choice(references["income_source"]),
+            }
+            for index in range(start, min(start + SEED_BATCH, incomes))
+        ], ordered=False)
+
+    for collection in ROLLUP_SPECS:
+        await verify_rollups(collection, rebuild=True)
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int) -> Stats:
+    stats = Stats()
+    counter = itertools.count()
+
+    async def worker() -> None:
+        while next(counter) < requests:
+            json_body = scenario.body() if scenario.body else None
+            started = time.perf_counter()
+            response = await client.request(scenario.method, scenario.path, params=scenario.params, json=json_body)
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                stats.errors += 1
+                stats.error_statuses[response.status_code] = stats.error_statuses.get(response.status_code, 0) + 1
+            else:
+                stats.latencies.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+def _ms(value: Optional[float]) -> str:
+    return f"{value:>9.2f}" if value is not None else f"{'-':>9}"
+
+
+async def run(args: argparse.Namespace) -> dict:
+    random.seed(args.seed)
+    stub_monobank(args.statement_size)
+    mongo_client = ExpenseManagerMongoClient()
+    results: Dict[str, Dict[str, dict]] = {}
+
+    async with main.app.router.lifespan_context(main.app):
+        # Unhandled exceptions become 500 responses and are counted as errors
+        transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for scale in args.scales:
+                started = time.perf_counter()
+                await seed(mongo_client, scale)
+                print(f"seeded {scale} expenses in {time.perf_counter() - started:.1f} s")
+
+                results[str(scale)] = {}
+                for scenario in SCENARIOS:
+                    if scenario.max_scale is not None and scale > scenario.max_scale:
+                        continue
+                    requests = min(args.requests, scenario.max_requests or args.requests)
+                    concurrency = min(args.concurrency, requests)
+                    await run_scenario(client, scenario, min(args.warmup, requests), concurrency)
+                    summary = (await run_scenario(client, scenario, requests, concurrency)).summary()
+                    results[str(scale)][scenario.name] = summary
+                    print(
+                        f"  {scenario.name:<28} p50 {_ms(summary['p50_ms'])} ms  p95 {_ms(summary['p95_ms'])} ms  "
+                        f"p99 {_ms(summary['p99_ms'])} ms  {summary['throughput_rps']:>8.1f} rps  "
+                        f"rss {summary['peak_rss_mb']} MB  errors {summary['errors']} {summary['error_statuses'] or ''}"
+                    )
+
+    return {
+        "meta": {
+            "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "statement_size": args.statement_size,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def failures(results: dict) -> List[str]:
+    """Describe every scenario that had failed requests"""
+    return [
+        f"{scale} {name}: {metrics['errors']} of {metrics['requests']} requests failed {metrics.get('error_statuses', '')}"
+        for scale, scenarios in results["results"].items()
+        for name, metrics in scenarios.items()
+        if metrics["errors"]
+    ]
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Describe every metric that got worse than ``baseline`` by more than ``threshold`` and every error increase"""
+    regressions = []
+    for scale, scenarios in current["results"].items():
+        for name, metrics in scenarios.items():
+            reference = baseline["results"].get(scale, {}).get(name)
+            if reference is None:
+                continue
+            if metrics["errors"] > reference["errors"]:
+                regressions.append(f"{scale} {name} errors: {reference['errors']} -> {metrics['errors']}")
+            for metric, higher_is_worse in COMPARED_METRICS:
+                before, after = reference[metric], metrics[metric]
+                if not before or after is None:
+                    continue
+                change = (after - before) / before
+                if (change if higher_is_worse else -change) > threshold:
+                    regressions.append(f"{scale} {name} {metric}: {before} -> {after} ({change:+.0%})")
+    return regressions
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--statement-size", type=int, default=50, help="transactions per stubbed Monobank statement")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--results", type=Path, help="compare an existing results file instead of running")
+    parser.add_argument("--baseline", type=Path, help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="tolerated relative regression")
+    args = parser.parse_args()
+
+    if args.results:
+        current = json.loads(args.results.read_text())
+    else:
+        current = asyncio.run(run(args))
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2))
+        print(f"results written to {args.output}")
+
+    failed = failures(current)
+    for failure in failed:
+        print(f"ERRORS {failure}")
+
+    if args.baseline:
+        regressions = compare(json.loads(args.baseline.read_text()), current, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            print(f"FAIL: {len(regressions)} metrics regressed more than {args.threshold:.0%} or gained errors")
+            return 1
+        print("no regressions against baseline")
+    if failed:
+        print(f"FAIL: {len(failed)} scenarios had failed requests")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
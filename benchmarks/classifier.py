@@ -0,0 +1,114 @@
+"""Statement classification throughput: the former per-keyword scans vs. the compiled classifier.
+
+    python benchmarks/classifier.py [--sizes 10000 100000 1000000] [--keywords 5 50 500]
+
+``--keywords`` adds that many synthetic internal-transfer keywords to the shipped rules, showing
+how both approaches scale with the rule set rather than with the statement size alone.
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.classifier import DATA_DIR, TransactionClassifier  # noqa: E402
+
+DESCRIPTIONS = [
+    "Сільпо", "АТБ", "Uber", "Bolt", "WOG", "OKKO", "Rozetka", "Netflix", "Apple", "McDonald's",
+    "Поповнення «Банка»", "Переказ на картку", "Округлення балансу", "Trip to Lviv", "Нова Пошта",
+]
+MERCHANTS = 200
+UNIQUE_SHARE = 0.2
+MCCS = [5411, 5499, 4121, 5541, 5732, 4899, 5814, 5812, 5912, 7832, 6011, 4829, 0, 3012, 8099]
+
+# The mapping and keyword list the classifier replaced, kept here as the reference point
+LEGACY_MCC = {
+    5411: "groceries", 5422: "meat", 5441: "candy", 5451: "dairy", 5462: "bakery", 5812: "restaurants",
+    5813: "bars", 5814: "fast_food", 5311: "department_store", 5651: "clothing", 5999: "shopping_other",
+    5912: "pharmacy", 4111: "transport", 4121: "taxi", 4899: "subscription", 4814: "telecom",
+    4829: "transfers", 7941: "fitness", 0: "other",
+}
+
+
+def make_description(index: int) -> str:
+    # Most descriptions come from a few thousand recurring merchants, the rest are one-off texts
+    if random.random() < UNIQUE_SHARE:
+        return f"{random.choice(DESCRIPTIONS)} {index}"
+    return f"{random.choice(DESCRIPTIONS)} #{random.randrange(MERCHANTS)}"
+
+
+def make_statement(size: int) -> List[dict]:
+    return [
+        {
+            "id": f"tx-{index}",
+            "time": 1_700_000_000 + index,
+            "amount": random.choice([-1, -1, -1, 1]) * random.randint(100, 500_000),
+            "description": make_description(index),
+            "counterName": random.choice(["", "ТОВ Роботодавець", "Іван"]),
+            "mcc": random.choice(MCCS),
+        }
+        for index in range(size)
+    ]
+
+
+def legacy_classify(statement: List[dict], internal: List[str]) -> list:
+    results = []
+    for transaction in statement:
+        description = transaction.get("description", "")
+        if any(keyword in description for keyword in internal):
+            results.append(None)
+        elif transaction["amount"] < 0:
+            results.append(LEGACY_MCC.get(transaction.get("mcc", 0), "other").upper())
+        else:
+            results.append("Salary" if transaction.get("counterName") == "ТОВ Роботодавець" else "Present")
+    return results
+
+
+def write_rules(directory: Path, extra_keywords: int) -> Dict[str, object]:
+    rules = json.loads((DATA_DIR / "classification_rules.json").read_text(encoding="utf-8"))
+    internal = next(rule for rule in rules["rules"] if rule["action"] == "internal")
+    internal["keywords"] += [f"Службовий переказ {index:04d}" for index in range(extra_keywords)]
+    (directory / "rules.json").write_text(json.dumps(rules, ensure_ascii=False), encoding="utf-8")
+    return internal
+
+
+def measure(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--keywords", type=int, nargs="+", default=[0, 50, 500])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    random.seed(0)
+
+    print(f"{'rows':>8}  {'keywords':>8}  {'legacy tx/s':>12}  {'compiled tx/s':>14}  {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for extra in args.keywords:
+            internal = write_rules(Path(directory), extra)
+            classifier = TransactionClassifier(Path(directory) / "rules.json", DATA_DIR / "mcc_categories.csv")
+            classifier.reload()
+            for size in args.sizes:
+                statement = make_statement(size)
+                legacy = measure(lambda: legacy_classify(statement, internal["keywords"]), args.repeat)
+                compiled = measure(lambda: classifier.classify_batch(statement), args.repeat)
+                print(
+                    f"{size:>8}  {len(internal['keywords']):>8}  {size / legacy:>12,.0f}  "
+                    f"{size / compiled:>14,.0f}  {legacy / compiled:>7.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Cold-start budget check: imports ``main`` under ``python -X importtime``.
+
+    python benchmarks/import_time.py [--budget-ms 1500] [--top 15]
+
+Exits with status 1 when the cumulative import time of ``main`` exceeds the budget
+or when a module that must be loaded lazily shows up during startup.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", 1500))
+# Third-party clients only needed by the Monobank endpoints on first use
+LAZY_MODULES = ("httpx", "monobank", "requests")
+
+# The tree depth is the indentation after the single space separating it from the ``|``
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def measure(runs: int) -> Tuple[float, List[Tuple[str, int]]]:
+    """Best cumulative time of ``import main`` in ms and the per-module timings of that run.
+
+    Raises RuntimeError when the output has no top-level ``main`` entry to measure.
+    """
+    env = dict(os.environ)
+    env.setdefault("DB_NAME", "benchmark")
+    best_ms, best_modules = float("inf"), []
+
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        modules = []
+        total_us = None
+        for line in result.stderr.splitlines():
+            match = LINE.match(line)
+            if not match:
+                continue
+            _, cumulative, indent, name = match.groups()
+            modules.append((name, int(cumulative)))
+            if name == "main" and not indent:
+                total_us = int(cumulative)
+        if total_us is None:
+            raise RuntimeError(f"No top-level import of main in the -X importtime output:\n{result.stderr[-2000:]}")
+        if total_us / 1000 < best_ms:
+            best_ms, best_modules = total_us / 1000, modules
+    return best_ms, best_modules
+
+
+def check(total_ms: float, modules: List[Tuple[str, int]], budget_ms: float = BUDGET_MS) -> List[str]:
+    """Budget violations of a measured startup, empty when it is within budget"""
+    failures = []
+    eager = sorted({name for name, _ in modules if name.split(".")[0] in LAZY_MODULES})
+    if eager:
+        failures.append(f"imported at startup but expected to be lazy: {', '.join(eager)}")
+    if total_ms > budget_ms:
+        failures.append(f"startup import budget exceeded: {total_ms:.1f} ms > {budget_ms:.0f} ms")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    total_ms, modules = measure(args.runs)
+    print(f"import main: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms, best of {args.runs})")
+    for name, cumulative in sorted(modules, key=lambda module: module[1], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failures = check(total_ms, modules, args.budget_ms)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Per-row cost of list serialization: Pydantic models vs. the compiled projection + orjson path.
+
+    python benchmarks/serialization.py [--sizes 1000 10000 100000]
+"""
+import argparse
+import datetime
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.expense import Expense  # noqa: E402
+from app.utils.serialization import compile_projector, dumps  # noqa: E402
+
+
+def make_documents(size: int) -> List[dict]:
+    category = {"_id": ObjectId(), "name": "GROCERIES"}
+    start = datetime.datetime(2024, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "mono_id": f"statement-{index}",
+            "date": start + datetime.timedelta(minutes=index),
+            "amount": 10.0 + index % 100,
+            "comment": f"Purchase #{index}",
+            "category": category,
+        }
+        for index in range(size)
+    ]
+
+
+def pydantic_path(documents: List[dict]) -> bytes:
+    # What FastAPI does for response_model=List[Expense]: construct, validate, then encode
+    adapter = TypeAdapter(List[Expense])
+    models = [Expense(**document) for document in documents]
+    return adapter.dump_json(adapter.validate_python(jsonable_encoder(models, by_alias=True)), by_alias=True)
+
+
+def fast_path(documents: List[dict]) -> bytes:
+    project = compile_projector(Expense)
+    return dumps([project(document) for document in documents])
+
+
+def measure(func, documents: List[dict], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(documents)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8}  {'pydantic us/row':>16}  {'fast us/row':>12}  {'speedup':>8}")
+    for size in args.sizes:
+        documents = make_documents(size)
+        slow = measure(pydantic_path, documents, args.repeat)
+        fast = measure(fast_path, documents, args.repeat)
+        print(f"{size:>8}  {slow / size * 1e6:>16.2f}  {fast / size * 1e6:>12.2f}  {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,84 @@
+from contextlib import asynccontextmanager
+
+import time
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from loguru import logger
 
+from app.db.indexes import ensure_indexes
+from app.db.migrations import backfill_name_keys
+from app.db.mongo_client import ExpenseManagerMongoClient
 from app.routes.categories import categories_router
+from app.routes.events import events_router
 from app.routes.expenses import expenses_router
+from app.routes.export import export_router
 from app.routes.incomes import incomes_router
 from app.routes.income_source import incomes_sources_router
+from app.routes.metrics import metrics_router
+from app.routes.reconcile import reconcile_router
 from app.routes.mono_client import expenses_mono_router
+from app.routes.reports import reports_router
+from app.services.events import event_broker
+from app.services.monobank_api import mono_api
+from app.services.reconciler import reference_reconciler
+from app.services.webhook_queue import webhook_queue
+from app.utils.conditional import ETAG_HEADER
+from app.utils.log import configure_logging
+from app.utils.metrics import REQUEST_LATENCY
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+configure_logging()
+
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    mongo_client = ExpenseManagerMongoClient()
+    await mongo_client.connect()
+    await backfill_name_keys(mongo_client)
+    await ensure_indexes(mongo_client)
+    webhook_queue.start()
+    reference_reconciler.start()
+    event_broker.start()
+    yield
+    await event_broker.stop()
+    await reference_reconciler.stop()
+    await webhook_queue.stop()
+    await mono_api.close()
+    mongo_client.close()
+    await logger.complete()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(categories_router, prefix="/categories", tags=["Categories"])
 app.include_router(expenses_router, prefix="/expenses", tags=["Expenses"])
 app.include_router(incomes_router, prefix="/incomes", tags=["Incomes"])
 app.include_router(incomes_sources_router, prefix="/income_sources", tags=["IncomeSource"])
 app.include_router(expenses_mono_router, prefix="/expenses_mono", tags=["ExpensesMono"])
+app.include_router(reports_router, prefix="/reports", tags=["Reports"])
+app.include_router(export_router, prefix="/export", tags=["Export"])
+app.include_router(reconcile_router, prefix="/reconcile", tags=["Reconcile"])
+app.include_router(metrics_router, prefix="/metrics", tags=["Metrics"])
+app.include_router(events_router, prefix="/events", tags=["Events"])
+
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template rather than raw path to keep cardinality bounded
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(
+            request.method,
+            getattr(route, "path", "unmatched"),
+            status_code,
+        ).observe(time.perf_counter() - started)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,6 +86,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, ETAG_HEADER],
 )
 
 
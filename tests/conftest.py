@@ -0,0 +1,31 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Settings are read from the environment when app modules are imported
+os.environ.setdefault("DB_NAME", "tests")
+os.environ.setdefault("MONGO_HOST", "mongodb://localhost:27017")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    """The process-wide client backed by an in-memory mongomock database"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from mongomock.collection import BulkOperationBuilder
+
+    from app.db.mongo_client import ExpenseManagerMongoClient
+
+    # pymongo 4.14 passes ``sort`` to bulk update builders, which mongomock does not accept yet
+    add_update = BulkOperationBuilder.add_update
+    monkeypatch.setattr(
+        BulkOperationBuilder,
+        "add_update",
+        lambda self, *args, sort=None, **kwargs: add_update(self, *args, **kwargs),
+    )
+    mongo_client = ExpenseManagerMongoClient()
+    monkeypatch.setattr(mongo_client, "_client", mongomock_motor.AsyncMongoMockClient())
+    return mongo_client
@@ -0,0 +1,82 @@
+import asyncio
+import datetime
+
+import httpx
+from fastapi import FastAPI
+
+from app.routes.mono_client import expenses_mono_router
+from app.services import backfill
+from app.services.monobank_api import mono_api
+
+
+def test_import_answers_with_a_job_and_imports_in_the_background(mongo_client, monkeypatch):
+    now = int(datetime.datetime.now().timestamp())
+    calls = []
+
+    async def get_statements(account, start, end):
+        calls.append(account)
+        return [{"id": f"{account}-1", "time": now - 60, "amount": -1000, "description": "Coffee", "mcc": 5814}]
+
+    monkeypatch.setattr(mono_api, "get_statements", get_statements)
+    monkeypatch.setattr(backfill.statement_limiter, "interval", 0)
+    app = FastAPI()
+    app.include_router(expenses_mono_router, prefix="/expenses_mono")
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post("/expenses_mono/import", params={"days": 2, "accounts": ["a", "b"]})
+            await asyncio.gather(*backfill._running.values())
+            job = (await client.get(f"/expenses_mono/backfill/{response.json()['_id']}")).json()
+        return response, job, await mongo_client.db["expenses"].count_documents({})
+
+    response, job, stored = asyncio.run(scenario())
+
+    assert response.status_code == 202
+    assert set(response.json()["accounts"]) == {"a", "b"}
+    assert job["status"] == "completed"
+    assert sorted(calls) == ["a", "b"]
+    assert stored == 2
+
+
+def statement_page(times, prefix):
+    return [
+        {"id": f"{prefix}-{index}", "time": time, "amount": -100, "description": "", "mcc": 0}
+        for index, time in enumerate(sorted(times, reverse=True))
+    ]
+
+
+def test_truncated_page_continues_from_the_second_of_its_oldest_item(monkeypatch):
+    start = datetime.datetime(2024, 1, 1)
+    base = int(start.timestamp()) + 1000
+    # The first page ends among the items of second ``base``, one of them is only on the second page
+    first = statement_page([base + 1] * (backfill.STATEMENT_PAGE_LIMIT - 2) + [base] * 2, "p")
+    second = first[-2:] + statement_page([base, base - 5], "q")
+    requested = []
+
+    async def get_statements(account, date_from, date_to):
+        requested.append(int(date_to.timestamp()))
+        return first if len(requested) == 1 else second
+
+    monkeypatch.setattr(backfill, "get_statements", get_statements)
+    transactions = asyncio.run(backfill.fetch_window("a", start, start + datetime.timedelta(days=1)))
+
+    assert requested[1] == base
+    assert len(transactions) == backfill.STATEMENT_PAGE_LIMIT + 2
+    assert len({item["id"] for item in transactions}) == len(transactions)
+
+
+def test_page_of_a_single_second_stops_instead_of_repeating(monkeypatch):
+    start = datetime.datetime(2024, 1, 1)
+    end = start + datetime.timedelta(hours=1)
+    page = statement_page([int(end.timestamp())] * backfill.STATEMENT_PAGE_LIMIT, "p")
+    calls = []
+
+    async def get_statements(account, date_from, date_to):
+        calls.append(date_to)
+        return page
+
+    monkeypatch.setattr(backfill, "get_statements", get_statements)
+    transactions = asyncio.run(backfill.fetch_window("a", start, end))
+
+    assert len(calls) == 1
+    assert len(transactions) == backfill.STATEMENT_PAGE_LIMIT
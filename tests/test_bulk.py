@@ -0,0 +1,34 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app.routes.expenses import expenses_router
+from app.services import bulk
+
+
+def test_malformed_ndjson_line_is_reported_without_failing_stored_chunks(mongo_client, monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_CHUNK_SIZE", 2)
+    app = FastAPI()
+    app.include_router(expenses_router, prefix="/expenses")
+    line = b'{"date": "2024-01-01T10:00:00", "amount": 1.5, "comment": "Coffee", "category_name": "food"}\n'
+
+    async def scenario():
+        await mongo_client.db["categories"].insert_one({"name": "Food", "name_key": "food"})
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post(
+                "/expenses/bulk",
+                content=line * 3 + b"{bad\n",
+                headers={"Content-Type": "application/x-ndjson"},
+            )
+        stored = await mongo_client.db["expenses"].count_documents({})
+        return response, stored
+
+    response, stored = asyncio.run(scenario())
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["failed"], stored) == (3, 1, 3)
+    assert [result["status"] for result in body["results"]] == ["created"] * 3 + ["error"]
+    assert body["results"][3]["index"] == 3
+    assert body["results"][3]["detail"].startswith("Malformed JSON")
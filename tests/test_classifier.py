@@ -0,0 +1,70 @@
+import json
+import random
+
+import pytest
+
+from app.services.classifier import DATA_DIR, INTERNAL, KeywordMatcher, TransactionClassifier
+
+
+def naive_match(keywords, text, ignore_case=False):
+    if ignore_case:
+        text = text.lower()
+    return {
+        index
+        for keyword, indexes in keywords.items()
+        if (keyword.lower() if ignore_case else keyword) in text
+        for index in indexes
+    }
+
+
+@pytest.fixture
+def make_classifier(tmp_path):
+    def make(rules):
+        path = tmp_path / "rules.json"
+        path.write_text(json.dumps({"rules": rules}, ensure_ascii=False), encoding="utf-8")
+        classifier = TransactionClassifier(path, DATA_DIR / "mcc_categories.csv")
+        classifier.reload()
+        return classifier
+    return make
+
+
+def test_prefix_keyword_of_a_longer_one_is_reported():
+    matcher = KeywordMatcher({"Поповнення": {0}, "Поповнення мобільного": {1}}, ignore_case=False)
+
+    assert matcher.match("Поповнення мобільного") == {0, 1}
+    assert matcher.match("Поповнення картки") == {0}
+
+
+@pytest.mark.parametrize("ignore_case", [False, True])
+def test_matches_every_substring_keyword(ignore_case):
+    generator = random.Random(0)
+    for _ in range(3000):
+        keywords = {}
+        for index in range(generator.randint(1, 6)):
+            keyword = "".join(generator.choice("abAB") for _ in range(generator.randint(1, 4)))
+            keywords.setdefault(keyword, set()).add(index)
+        text = "".join(generator.choice("abAB ") for _ in range(generator.randint(0, 12)))
+
+        matcher = KeywordMatcher(keywords, ignore_case)
+
+        assert matcher.match(text) == naive_match(keywords, text, ignore_case), (keywords, text)
+
+
+def test_first_rule_in_file_order_decides_on_overlapping_prefixes(make_classifier):
+    classifier = make_classifier([
+        {"action": "internal", "keywords": ["Поповнення"]},
+        {"action": "category", "value": "MOBILE", "keywords": ["Поповнення мобільного"]},
+    ])
+
+    transaction = {"amount": -100, "description": "Поповнення мобільного", "mcc": 4814}
+    assert classifier.classify(transaction) is INTERNAL
+
+
+def test_later_prefix_rule_does_not_shadow_earlier_longer_rule(make_classifier):
+    classifier = make_classifier([
+        {"action": "category", "value": "MOBILE", "keywords": ["Поповнення мобільного"]},
+        {"action": "internal", "keywords": ["Поповнення"]},
+    ])
+
+    assert classifier.classify({"amount": -100, "description": "Поповнення мобільного", "mcc": 0}).category == "MOBILE"
+    assert classifier.classify({"amount": -100, "description": "Поповнення банки", "mcc": 0}) is INTERNAL
@@ -0,0 +1,55 @@
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.routes.expenses import expenses_router
+from app.utils.filters import range_filter
+from app.utils.utils import to_naive_local
+
+
+def test_bounds_build_half_open_date_and_closed_amount_ranges():
+    assert range_filter(datetime(2024, 1, 1), datetime(2024, 2, 1), 10, 10) == {
+        "date": {"$gte": datetime(2024, 1, 1), "$lt": datetime(2024, 2, 1)},
+        "amount": {"$gte": 10, "$lte": 10},
+    }
+    assert range_filter() == {}
+    assert range_filter(max_amount=5) == {"amount": {"$lte": 5}}
+
+
+@pytest.mark.parametrize("date_from, date_to", [
+    (datetime(2024, 1, 1), datetime(2024, 1, 1)),
+    (datetime(2024, 1, 2), datetime(2024, 1, 1)),
+    (datetime(2024, 1, 3, tzinfo=timezone.utc), datetime(2024, 1, 1)),
+    (datetime(2024, 1, 3), datetime(2024, 1, 1, tzinfo=timezone.utc)),
+])
+def test_empty_date_range_is_rejected(date_from, date_to):
+    with pytest.raises(ValueError, match="'from' must be earlier than 'to'"):
+        range_filter(date_from, date_to)
+
+
+def test_empty_amount_range_is_rejected():
+    with pytest.raises(ValueError, match="'min_amount' must not exceed 'max_amount'"):
+        range_filter(min_amount=2, max_amount=1)
+
+
+def test_aware_and_naive_bounds_are_compared_as_naive_local_time():
+    aware = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    assert range_filter(aware, datetime(2024, 1, 3)) == {
+        "date": {"$gte": to_naive_local(aware), "$lt": datetime(2024, 1, 3)},
+    }
+
+
+def test_expenses_list_accepts_mixed_aware_and_naive_bounds(mongo_client):
+    app = FastAPI()
+    app.include_router(expenses_router, prefix="/expenses")
+
+    async def request(params):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get("/expenses/all", params=params)
+
+    assert asyncio.run(request({"from": "2024-01-01T00:00:00Z", "to": "2024-01-03"})).status_code == 200
+    assert asyncio.run(request({"from": "2024-01-03T00:00:00Z", "to": "2024-01-01"})).status_code == 400
@@ -0,0 +1,15 @@
+from benchmarks.import_time import BUDGET_MS, LINE, check, measure
+
+
+def test_top_level_line_has_no_indent():
+    match = LINE.match("import time:       345 |       2426 | main")
+    assert match is not None
+    assert match.group(3) == ""
+    assert LINE.match("import time:       580 |       1399 |   json.decoder").group(3) == "  "
+
+
+def test_startup_within_import_budget():
+    total_ms, modules = measure(runs=3)
+
+    assert total_ms > 0
+    assert check(total_ms, modules, BUDGET_MS) == []
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from app.db.indexes import INDEXES, ensure_indexes
+
+
+def index_names(mongo_client, collection):
+    return set(asyncio.run(mongo_client.db[collection].index_information()))
+
+
+def test_indexes_are_created(mongo_client):
+    asyncio.run(ensure_indexes(mongo_client))
+
+    for spec in INDEXES:
+        assert spec.name in index_names(mongo_client, spec.collection)
+
+
+def test_unique_index_that_cannot_be_built_fails_startup(mongo_client):
+    asyncio.run(mongo_client.db["expenses"].insert_many([{"mono_id": "a"}, {"mono_id": "a"}]))
+
+    with pytest.raises(RuntimeError, match="unique index mono_id on expenses"):
+        asyncio.run(ensure_indexes(mongo_client))
+
+    # The other indexes of the collection and of the other collections are still built
+    assert {"date_id", "amount_id", "category_date"} <= index_names(mongo_client, "expenses")
+    assert "mono_id" not in index_names(mongo_client, "expenses")
+    assert "mono_id" in index_names(mongo_client, "incomes")
+
+
+def test_retired_index_that_cannot_be_dropped_fails_startup(mongo_client, monkeypatch):
+    asyncio.run(mongo_client.db["categories"].create_index("name", name="name_ci"))
+    collection = type(mongo_client.db["categories"])
+
+    async def drop_index(self, name):
+        raise OperationFailure("not authorized")
+
+    monkeypatch.setattr(collection, "drop_index", drop_index)
+
+    with pytest.raises(RuntimeError, match="retired index name_ci on categories"):
+        asyncio.run(ensure_indexes(mongo_client))
@@ -0,0 +1,36 @@
+import asyncio
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.db.migrations import backfill_name_keys
+
+
+def test_case_variant_duplicates_are_merged_before_the_unique_index(mongo_client):
+    food, food_lower, food_spaced, fun = ObjectId(), ObjectId(), ObjectId(), ObjectId()
+
+    async def scenario():
+        await mongo_client.db["categories"].insert_many([
+            {"_id": food, "name": "Food"},
+            {"_id": food_lower, "name": "food"},
+            {"_id": food_spaced, "name": " FOOD "},
+            {"_id": fun, "name": "Fun"},
+        ])
+        await mongo_client.db["expenses"].insert_many([
+            {"date": datetime(2024, 1, 1), "amount": 1.0, "category": {"_id": food, "name": "Food"}},
+            {"date": datetime(2024, 1, 2), "amount": 2.0, "category": {"_id": food_lower, "name": "food"}},
+            {"date": datetime(2024, 1, 3), "amount": 3.0, "category": {"_id": food_spaced, "name": " FOOD "}},
+            {"date": datetime(2024, 1, 4), "amount": 4.0, "category": {"_id": fun, "name": "Fun"}},
+        ])
+
+        await backfill_name_keys(mongo_client, ["categories"])
+        await mongo_client.db["categories"].create_index("name_key", unique=True)
+
+        categories = await mongo_client.db["categories"].find({}, {"name": 1}).sort("_id", 1).to_list(None)
+        expenses = await mongo_client.db["expenses"].find({}, {"category": 1}).sort("date", 1).to_list(None)
+        return categories, [expense["category"] for expense in expenses]
+
+    categories, embedded = asyncio.run(scenario())
+
+    assert categories == [{"_id": food, "name": "Food"}, {"_id": fun, "name": "Fun"}]
+    assert embedded == [{"_id": food, "name": "Food"}] * 3 + [{"_id": fun, "name": "Fun"}]
@@ -0,0 +1,45 @@
+import dataclasses
+
+import pytest
+from pymongo import ReadPreference
+
+from app.db.mongo_client import ExpenseManagerMongoClient, create_client
+from app.db.settings import MongoSettings
+
+
+@pytest.fixture
+def real_client(monkeypatch):
+    """The shared client backed by a real, never connected AsyncIOMotorClient"""
+    mongo_client = ExpenseManagerMongoClient()
+    monkeypatch.setattr(mongo_client, "_client", None)
+    yield mongo_client
+    mongo_client.close()
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("primary", ReadPreference.PRIMARY),
+    ("primaryPreferred", ReadPreference.PRIMARY_PREFERRED),
+    ("secondaryPreferred", ReadPreference.SECONDARY_PREFERRED),
+    ("nearest", ReadPreference.NEAREST),
+])
+def test_read_db_uses_configured_read_preference(real_client, monkeypatch, name, expected):
+    monkeypatch.setattr(real_client, "settings", dataclasses.replace(real_client.settings, read_preference=name))
+
+    assert real_client.read_db.read_preference == expected
+    assert real_client._collection("expenses", read_only=True).read_preference == expected
+    assert real_client._collection("expenses").read_preference == ReadPreference.PRIMARY
+
+
+def test_invalid_read_preference_is_rejected(monkeypatch):
+    monkeypatch.setenv("MONGO_READ_PREFERENCE", "secondaryMaybe")
+
+    with pytest.raises(ValueError, match="secondaryMaybe"):
+        MongoSettings.from_env()
+
+
+def test_create_client_accepts_settings():
+    client = create_client(dataclasses.replace(MongoSettings.from_env(), compressors="zlib", max_idle_time_ms=1000))
+    try:
+        assert client.options.pool_options.max_pool_size == 10
+    finally:
+        client.close()
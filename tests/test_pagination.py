@@ -0,0 +1,78 @@
+import asyncio
+import base64
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.utils.pagination import SortOrder, decode_cursor, encode_cursor, keyset_filter, split_page
+
+
+def record(day: int, amount: float) -> dict:
+    return {"_id": ObjectId(), "date": datetime(2024, 1, day, 12, 30, 15, 123000), "amount": amount}
+
+
+@pytest.mark.parametrize("order", list(SortOrder))
+def test_cursor_round_trips_for_every_sort_order(order):
+    document = record(3, 1234.56)
+
+    value, _id = decode_cursor(encode_cursor(document, order.spec), order.spec)
+
+    assert (value, _id) == (document[order.field], document["_id"])
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"no separator").decode(),
+    base64.urlsafe_b64encode(b"2024-01-01T00:00:00|not-an-object-id").decode(),
+    base64.urlsafe_b64encode(f"yesterday|{ObjectId()}".encode()).decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe|" + str(ObjectId()).encode()).decode(),
+    "",
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        keyset_filter(cursor)
+
+
+def test_amount_cursor_is_rejected_for_a_date_sort():
+    cursor = encode_cursor(record(1, 10.0), SortOrder.amount_desc.spec)
+
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, SortOrder.date_desc.spec)
+
+
+@pytest.mark.parametrize("order", list(SortOrder))
+def test_pages_cover_ties_on_the_sort_key_exactly_once(mongo_client, order):
+    # Three records per date and per amount, only ``_id`` orders them within a tie
+    records = [record(1 + index // 3, float(10 * (index % 4))) for index in range(12)]
+    records[0]["date"] = records[1]["date"] = records[2]["date"] = records[5]["date"] = datetime(2024, 1, 1)
+
+    async def scenario():
+        await mongo_client.db["expenses"].insert_many([dict(document) for document in records])
+        pages, cursor = [], None
+        while True:
+            batch = await mongo_client.db["expenses"].find(
+                keyset_filter(cursor, {"amount": {"$gte": 0}}, order.spec),
+                sort=order.spec,
+                limit=3,
+            ).to_list(None)
+            page, cursor = split_page(batch, 2, order.spec)
+            pages.append([document["_id"] for document in page])
+            if cursor is None:
+                return pages
+
+    pages = asyncio.run(scenario())
+
+    field, direction = order.spec[0]
+    expected = sorted(records, key=lambda document: (document[field], document["_id"]), reverse=direction == -1)
+    assert [_id for page in pages for _id in page] == [document["_id"] for document in expected]
+    assert all(len(page) == 2 for page in pages)
+
+
+def test_last_page_has_no_cursor():
+    documents = [record(1, 1.0), record(2, 2.0)]
+
+    assert split_page(documents, 2) == (documents, None)
+    page, cursor = split_page(documents + [record(3, 3.0)], 2)
+    assert page == documents
+    assert decode_cursor(cursor)[1] == documents[-1]["_id"]
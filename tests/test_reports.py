@@ -0,0 +1,39 @@
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+from fastapi import FastAPI
+
+from app.routes.reports import reports_router
+from app.utils.utils import to_naive_local
+
+
+def get(path: str, **params) -> httpx.Response:
+    app = FastAPI()
+    app.include_router(reports_router, prefix="/reports")
+
+    async def request():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get(path, params=params)
+
+    return asyncio.run(request())
+
+
+def test_aware_datetimes_become_naive_local_time():
+    aware = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+    assert to_naive_local(aware) == aware.astimezone().replace(tzinfo=None)
+    assert to_naive_local(datetime(2024, 1, 1)) == datetime(2024, 1, 1)
+    assert to_naive_local(None) is None
+
+
+def test_summary_accepts_an_aware_from_with_the_default_to(mongo_client):
+    response = get("/reports/summary", **{"from": "2024-01-01T00:00:00Z"})
+
+    assert response.status_code == 200
+    assert response.json()["date_from"] == to_naive_local(datetime(2024, 1, 1, tzinfo=timezone.utc)).isoformat()
+
+
+def test_summary_rejects_an_empty_range_mixing_aware_and_naive_bounds(mongo_client):
+    response = get("/reports/summary", **{"from": "2024-01-03T00:00:00Z", "to": "2024-01-01T00:00:00"})
+
+    assert response.status_code == 400
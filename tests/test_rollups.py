@@ -0,0 +1,130 @@
+import asyncio
+import random
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.services.rollups import (
+    ROLLUP_COLLECTION,
+    add_to_rollups,
+    merge_rollups,
+    remove_from_rollups,
+    rollup_id,
+    verify_rollups,
+)
+
+FOOD = {"_id": ObjectId(), "name": "Food"}
+FUN = {"_id": ObjectId(), "name": "Fun"}
+
+
+def expense(day: int, amount: float, category: dict = FOOD, month: int = 1) -> dict:
+    return {"_id": ObjectId(), "date": datetime(2024, month, day, 12), "amount": amount, "category": category}
+
+
+async def store(mongo_client, documents):
+    await mongo_client.db["expenses"].insert_many(documents)
+    await add_to_rollups("expenses", documents)
+
+
+async def delete(mongo_client, documents):
+    await mongo_client.db["expenses"].delete_many({"_id": {"$in": [document["_id"] for document in documents]}})
+    await remove_from_rollups("expenses", documents)
+
+
+async def buckets(mongo_client):
+    projection = {"sum": 1, "count": 1, "min": 1, "max": 1, "name": 1}
+    rows = await mongo_client.db[ROLLUP_COLLECTION].find({}, projection).to_list(None)
+    return {row.pop("_id"): row for row in rows}
+
+
+def test_adds_and_deletes_adjust_sum_and_count(mongo_client):
+    first, second, other_month = expense(1, 10.0), expense(2, 2.5), expense(1, 4.0, month=2)
+
+    async def scenario():
+        await store(mongo_client, [first, second, other_month])
+        added = await buckets(mongo_client)
+        await delete(mongo_client, [second])
+        return added, await buckets(mongo_client)
+
+    added, after_delete = asyncio.run(scenario())
+
+    january, february = rollup_id("expenses", "2024-01", FOOD["_id"]), rollup_id("expenses", "2024-02", FOOD["_id"])
+    assert added == {
+        january: {"sum": 12.5, "count": 2, "min": 2.5, "max": 10.0, "name": "Food"},
+        february: {"sum": 4.0, "count": 1, "min": 4.0, "max": 4.0, "name": "Food"},
+    }
+    assert after_delete[january] == {"sum": 10.0, "count": 1, "min": 10.0, "max": 10.0, "name": "Food"}
+    assert after_delete[february] == added[february]
+
+
+def test_deleting_the_extreme_records_recomputes_min_and_max(mongo_client):
+    low, middle, high = expense(1, 1.0), expense(2, 5.0), expense(3, 9.0)
+
+    async def scenario():
+        await store(mongo_client, [low, middle, high])
+        await delete(mongo_client, [low, high])
+        return await buckets(mongo_client)
+
+    assert asyncio.run(scenario()) == {
+        rollup_id("expenses", "2024-01", FOOD["_id"]): {"sum": 5.0, "count": 1, "min": 5.0, "max": 5.0, "name": "Food"},
+    }
+
+
+def test_deleting_every_record_of_a_bucket_drops_it(mongo_client):
+    records = [expense(1, 1.0), expense(2, 2.0, category=FUN)]
+
+    async def scenario():
+        await store(mongo_client, records)
+        await delete(mongo_client, records[:1])
+        return await buckets(mongo_client)
+
+    assert list(asyncio.run(scenario())) == [rollup_id("expenses", "2024-01", FUN["_id"])]
+
+
+def test_merging_a_category_moves_its_buckets_onto_the_target(mongo_client):
+    food, fun = [expense(1, 3.0), expense(1, 1.0, month=3)], [expense(2, 7.0, category=FUN)]
+
+    async def scenario():
+        await store(mongo_client, food + fun)
+        # Records are reassigned first, as the category merge does
+        await mongo_client.db["expenses"].update_many({"category._id": FUN["_id"]}, {"$set": {"category": FOOD}})
+        await merge_rollups("expenses", [FUN["_id"]], FOOD)
+        return await buckets(mongo_client), await verify_rollups("expenses")
+
+    merged, report = asyncio.run(scenario())
+
+    assert merged == {
+        rollup_id("expenses", "2024-01", FOOD["_id"]): {"sum": 10.0, "count": 2, "min": 3.0, "max": 7.0, "name": "Food"},
+        rollup_id("expenses", "2024-03", FOOD["_id"]): {"sum": 1.0, "count": 1, "min": 1.0, "max": 1.0, "name": "Food"},
+    }
+    assert (report["missing"], report["extra"], report["drifted"]) == ([], [], [])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_rollups_match_a_full_rebuild(mongo_client, seed):
+    rng = random.Random(seed)
+    records = [
+        expense(rng.randint(1, 28), round(rng.uniform(0.01, 500), 2), rng.choice([FOOD, FUN]), rng.randint(1, 4))
+        for _ in range(60)
+    ]
+    deleted = rng.sample(records, 20)
+
+    async def scenario():
+        for start in range(0, len(records), 15):
+            await store(mongo_client, records[start:start + 15])
+        await delete(mongo_client, deleted)
+        incremental = await buckets(mongo_client)
+        report = await verify_rollups("expenses")
+        await verify_rollups("expenses", rebuild=True)
+        return incremental, report, await buckets(mongo_client)
+
+    incremental, report, rebuilt = asyncio.run(scenario())
+
+    assert report["buckets"] == len(rebuilt) > 1
+    assert (report["missing"], report["extra"], report["drifted"]) == ([], [], [])
+    assert incremental.keys() == rebuilt.keys()
+    for _id, bucket in rebuilt.items():
+        assert incremental[_id]["sum"] == pytest.approx(bucket["sum"])
+        assert {key: incremental[_id][key] for key in ("count", "min", "max", "name")} == \
+            {key: bucket[key] for key in ("count", "min", "max", "name")}
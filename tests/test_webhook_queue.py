@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from app.models.webhook import StatementItem
+from app.services.webhook_queue import QUEUE_COLLECTION, WebhookQueue
+
+
+def statement_item(item_id: str, time: int = 1704103200) -> dict:
+    return {"id": item_id, "time": time, "amount": -1000, "description": "Coffee", "mcc": 5814}
+
+
+def test_failing_item_does_not_hold_back_the_rest_of_its_batch(mongo_client):
+    queue = WebhookQueue(batch_size=10, max_attempts=2)
+
+    async def scenario():
+        # Bypasses ``StatementItem`` validation the way an item queued before it existed would
+        for item in (statement_item("a"), statement_item("bad", time=10 ** 13), statement_item("b")):
+            await queue.enqueue("account", item)
+        await queue.process(await queue.claim())
+        entries = await mongo_client.db[QUEUE_COLLECTION].find({}, {"status": 1, "attempts": 1}).to_list(None)
+        expenses = await mongo_client.db["expenses"].find({}, {"mono_id": 1, "_id": 0}).to_list(None)
+        return {entry["_id"]: (entry["status"], entry["attempts"]) for entry in entries}, expenses
+
+    entries, expenses = asyncio.run(scenario())
+
+    assert entries == {"a": ("done", 0), "b": ("done", 0), "bad": ("pending", 1)}
+    assert sorted(expense["mono_id"] for expense in expenses) == ["a", "b"]
+    assert (queue.processed, queue.retried, queue.failed) == (2, 1, 0)
+
+
+def test_out_of_range_statement_time_is_rejected():
+    with pytest.raises(ValidationError):
+        StatementItem.model_validate(statement_item("bad", time=10 ** 13))
+    assert StatementItem.model_validate(statement_item("ok")).time == 1704103200